@@ -2,7 +2,7 @@ import streamlit as st
 import sqlite3
 from jamdict import Jamdict
 import os
-import opencc
+import zh_convert
 
 # --- 1. 初始化与配置 ---
 
@@ -50,39 +50,22 @@ def get_favorites_db_connection():
 
 # --- 2. 核心功能：汉字转换、搜索与排序 ---
 
-@st.cache_data
-def convert_to_japanese_char(input_char, area='Simplified'):
+@st.cache_resource
+def get_zh_translation_table(area='Simplified'):
     """
-    使用 opencc 将单个中文字符转换为日文新字体汉字。
+    加载 temp/make_transdb.py 预编译的逐字转换表（全 CJK 范围，四种 area）。
     area 参数决定了源语言区域。
     """
-    # 为了提升性能，将转换器实例缓存起来
-    if area == 'Simplified':
-        converter1 = opencc.OpenCC('s2t.json')
-        converter2 = opencc.OpenCC('t2jp.json')
-        return converter2.convert(converter1.convert(input_char))
-    elif area == 'Traditional':
-        converter1 = opencc.OpenCC('hk2t.json') # 通用繁体
-        return converter1.convert(input_char)
-    elif area == 'Taiwan Traditional':
-        converter1 = opencc.OpenCC('tw2t.json')
-        converter2 = opencc.OpenCC('t2jp.json')
-        return converter2.convert(converter1.convert(input_char))
-    elif area == 'Hong Kong variant':
-        converter1 = opencc.OpenCC('hk2t.json')
-        converter2 = opencc.OpenCC('t2jp.json')
-        return converter2.convert(converter1.convert(input_char))
-    else:
-        return input_char # 如果区域错误，返回原字符
+    return zh_convert.load_translation_table(area)
 
-def replace_zh_to_jp(query):
+def replace_zh_to_jp(query, area='Simplified'):
     """
-    遍历查询字符串的每个字符，如果字符是中文，则替换为对应的日文汉字。
+    用预编译的转换表一次性将查询中的中文字符替换为日文汉字。
     默认使用简体中文作为转换源。
     """
     # 这里我们默认使用 'Simplified' 区域进行转换，您可以根据需要进行修改
     # 例如，可以在界面上增加一个选项让用户选择输入的是哪种中文
-    return "".join([convert_to_japanese_char(char, 'Simplified') for char in query])
+    return zh_convert.replace_zh_to_jp(query, get_zh_translation_table(area))
 
 def search_word(jmd, query):
     """
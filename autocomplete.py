@@ -0,0 +1,106 @@
+import bisect
+import sqlite3
+from array import array
+
+from kana_utils import to_hiragana
+
+# 比任何假名/汉字都大的字符，用于计算前缀范围的上界
+_PREFIX_END = '\U0010ffff'
+
+
+class CompletionIndex:
+    """
+    输入补全用的前缀树：所有汉字形式和假名形式（片假名统一为平假名）按字典序排好，
+    树上的每个节点就是一段连续的区间。
+    覆盖的形式较多（>= precompute_min）的节点离线算好排序后的前 k 个补全，
+    查找时只需一次按前缀字符串的字典查找；其余节点的区间很小，直接现场排序。
+    排序沿用 ranking.RankFeatures：常用度 -> 词头长度 -> 词性。
+    """
+
+    def __init__(self, pairs, features, k=10, precompute_min=64):
+        # pairs: (显示文本, idseq)；查找用的键是显示文本的平假名形式
+        rows = sorted({(to_hiragana(text), text, idseq) for text, idseq in pairs if text})
+        self.keys = [key for key, _, _ in rows]
+        self.texts = [text for _, text, _ in rows]
+        self.idseqs = array('l', (idseq for _, _, idseq in rows))
+        self.k = k
+        self.precompute_min = precompute_min
+
+        # 每个词条的全局名次（越小越靠前），节点内排序只比较这个整数
+        ranked = features.rank(set(self.idseqs), "")
+        order = {idseq: i for i, idseq in enumerate(ranked)}
+        self.rank = array('l', (order[idseq] for idseq in self.idseqs))
+
+        # 前缀 -> 该节点排好序的前 k 个补全（self.keys 中的下标）
+        self.top = {}
+        self._precompute()
+
+    @classmethod
+    def from_db(cls, db_path, features, **kwargs):
+        """读取 Jamdict 数据库中的 Kanji 表和 Kana 表来构建补全索引。"""
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        try:
+            pairs = conn.execute("SELECT text, idseq FROM Kanji UNION ALL SELECT text, idseq FROM Kana").fetchall()
+        finally:
+            conn.close()
+        return cls(pairs, features, **kwargs)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _best(self, rows):
+        """按名次排序并按 idseq 去重，只保留前 k 个。"""
+        best, seen = [], set()
+        for row in sorted(rows, key=lambda r: (self.rank[r], r)):
+            idseq = self.idseqs[row]
+            if idseq not in seen:
+                seen.add(idseq)
+                best.append(row)
+                if len(best) >= self.k:
+                    break
+        return best
+
+    def _precompute(self):
+        """
+        按字典序扫描一遍所有键，用栈维护当前键路径上的节点（每个深度一个）。
+        节点关闭时，它的前 k 个由子节点的前 k 个和恰好在这里结束的形式合并得到，
+        再交给父节点，因此整体只需要 O(总字符数 * k) 的时间。
+        """
+        keys = self.keys
+        precompute_min = self.precompute_min
+        # 栈中每一项: [起始下标, 候选下标列表的列表]，第 d 项对应深度 d + 1 的节点
+        stack = []
+        prev = ""
+        for i, key in enumerate(keys + [""]):
+            lcp = 0
+            limit = min(len(prev), len(key))
+            while lcp < limit and prev[lcp] == key[lcp]:
+                lcp += 1
+            # 关闭比公共前缀更深的节点
+            depth = len(stack)
+            while depth > lcp:
+                start, parts = stack.pop()
+                best = parts[0] if len(parts) == 1 else self._best([row for part in parts for row in part])
+                if i - start >= precompute_min:
+                    self.top[prev[:depth]] = array('l', best)
+                depth -= 1
+                if depth:
+                    stack[-1][1].append(best)
+            if i == len(keys):
+                break
+            stack.extend([i, []] for _ in range(len(key) - depth))
+            stack[-1][1].append([i])
+            prev = key
+
+    def complete(self, prefix, limit=None):
+        """返回以 prefix 开头的补全 [(显示文本, idseq), ...]，按排序规则从高到低。"""
+        key = to_hiragana(prefix)
+        if not key:
+            return []
+        best = self.top.get(key)
+        if best is None:
+            lo = bisect.bisect_left(self.keys, key)
+            hi = bisect.bisect_right(self.keys, key + _PREFIX_END, lo)
+            best = self._best(range(lo, hi))
+        limit = self.k if limit is None else min(limit, self.k)
+        return [(self.texts[row], self.idseqs[row]) for row in best[:limit]]
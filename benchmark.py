@@ -0,0 +1,178 @@
+import argparse
+import json
+import math
+import platform
+import resource
+import sys
+import time
+
+from result_cache import ResultCache
+from search_engine import JMD_DB_PATH, SearchEngine, SearchResult
+from tracing import activate
+
+# 固定的查询语料：按输入类型分组，覆盖各层级和预处理的不同路径
+CORPUS = {
+    'kana': ['がっこう', 'たべる', 'ひらがな', 'ありがとう', 'こんにちは', 'すし', 'さくら', 'ねこ',
+             'べんきょう', 'カタカナ', 'コーヒー', 'しんぶん'],
+    'kanji': ['学校', '食べる', '日本語', '勉強', '電車', '図書館', '新聞', '天気', '先生', '漢字'],
+    'simplified': ['学习', '电车', '图书馆', '汉字', '东京', '泽', '机会', '发展', '自行车', '电脑'],
+    'traditional': ['學習', '電話', '圖書館', '漢語', '東京', '澤', '機會', '發展'],
+    'romaji': ['taberu', 'gakkou', 'konnichiwa', 'arigatou', 'benkyou', 'sushi', 'tōkyō', 'shinbun',
+               'nihongo', 'kawaii', 'gakk', 'tabe'],
+    'english': ['school', 'eat', 'book', 'water', 'cat', 'to eat', 'train station', 'the'],
+    'substring': ['っこう', 'べ物', 'ーター', 'んぶん'],
+    'sokuon_typo': ['がこう', 'ちょと', 'まて', 'きぷ', 'ざし', 'いしょに', 'がこお'],
+    'inflected': ['食べた', '行かない', '高くて', '食べなかった', '勉強した', '書きました', 'tabeta', '飲みたい'],
+    'sentence': ['私は毎日学校で日本語を勉強しています。', '昨日、友達と一緒に寿司を食べました！',
+                 '彼女は高くて美しい山に登りたかったが、雨が降ったので行かなかった。'],
+    'single_kanji': ['本', '水', '人', '日', '学', '食', '猫'],
+}
+
+STAGES = ('preprocess', 'segment', 'tier1', 'chinese', 'deinflect', 'suggestions', 'tier2', 'contains', 'gloss', 'tier3',
+          'includes', 'rank', 'hydrate', 'hydrate.senses', 'total')
+
+
+def max_rss_mb():
+    """进程到目前为止的内存占用峰值（Linux 上 ru_maxrss 的单位是 KB，macOS 上是字节）。"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def percentile(sorted_values, p):
+    """最近秩法计算百分位数。"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples):
+    """把一组耗时（秒）汇总成毫秒为单位的 p50/p95/p99。"""
+    values = sorted(samples)
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values) * 1000, 3),
+        'p50_ms': round(percentile(values, 50) * 1000, 3),
+        'p95_ms': round(percentile(values, 95) * 1000, 3),
+        'p99_ms': round(percentile(values, 99) * 1000, 3),
+        'max_ms': round(values[-1] * 1000, 3),
+    }
+
+
+def run_query(engine, query, stage_times):
+    """
+    跑一次完整的分层搜索，并像页面一样加载第一页词条；
+    各阶段的耗时直接取自 result.trace 中记录的 span。
+    """
+    result = SearchResult(query)
+    start = time.perf_counter()
+    for _ in engine.iter_search(result):
+        pass
+    with activate(result.trace):
+        # 和页面一样读取每个词条的义项（EntryView 的义项在第一次访问时才加载）
+        for entry in engine.page(result.tier1 or result.chinese or result.deinflect or result.tier2 or result.contains
+                                 or result.gloss or result.tier3 or result.includes):
+            entry.senses
+    stage_times['total'].append(time.perf_counter() - start)
+    for s in result.trace.spans:
+        if s.name in stage_times and s.duration is not None:
+            stage_times[s.name].append(s.duration)
+    return result
+
+
+def run_benchmark(db_path=JMD_DB_PATH, repeats=5, warmup=1, use_cache=False, log=print):
+    rss_before = max_rss_mb()
+    start = time.perf_counter()
+    engine = SearchEngine.from_db(db_path)
+    build_seconds = time.perf_counter() - start
+    rss_after_build = max_rss_mb()
+    log(f"引擎构建完成，用时 {build_seconds:.1f} 秒，内存峰值 {rss_after_build:.0f} MB")
+    if not use_cache:
+        # 默认测的是真实的搜索耗时，不让结果缓存命中
+        engine.cache = ResultCache(max_entries=0)
+
+    for _ in range(warmup):
+        for queries in CORPUS.values():
+            for query in queries:
+                engine.search(query)
+
+    stage_times = {stage: [] for stage in STAGES}
+    category_times = {}
+    for category, queries in CORPUS.items():
+        per_category = {stage: [] for stage in STAGES}
+        for _ in range(repeats):
+            for query in queries:
+                run_query(engine, query, per_category)
+        for stage, samples in per_category.items():
+            stage_times[stage] += samples
+        category_times[category] = summarize(per_category['total'])
+        log(f"{category}: p50 {category_times[category]['p50_ms']} ms")
+
+    return {
+        'meta': {
+            'db': db_path,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'queries': sum(len(queries) for queries in CORPUS.values()),
+            'repeats': repeats,
+            'warmup': warmup,
+            'cache': use_cache,
+        },
+        'build_seconds': round(build_seconds, 3),
+        'memory': {
+            'max_rss_mb_before_build': round(rss_before, 1),
+            'max_rss_mb_after_build': round(rss_after_build, 1),
+            'max_rss_mb': round(max_rss_mb(), 1),
+        },
+        'stages': {stage: summarize(samples) for stage, samples in stage_times.items()},
+        'categories': category_times,
+    }
+
+
+def compare(old, new):
+    """逐阶段对比两次基准测试结果的 p50/p95/p99，打印变化比例。"""
+    lines = []
+    for section in ('stages', 'categories'):
+        for name, stats in new.get(section, {}).items():
+            before = old.get(section, {}).get(name)
+            if not before or not stats.get('count'):
+                continue
+            cells = []
+            for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+                a, b = before.get(key), stats.get(key)
+                change = f"{(b - a) / a:+.0%}" if a else "n/a"
+                cells.append(f"{key[:3]} {a} -> {b} ({change})")
+            lines.append(f"{section}/{name}: " + ", ".join(cells))
+    a, b = old.get('memory', {}).get('max_rss_mb'), new.get('memory', {}).get('max_rss_mb')
+    lines.append(f"memory/max_rss_mb: {a} -> {b}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用固定的查询语料对搜索流程做基准测试")
+    parser.add_argument('--db', default=JMD_DB_PATH, help="Jamdict 词典数据库路径")
+    parser.add_argument('--repeats', type=int, default=5, help="每个查询重复的次数")
+    parser.add_argument('--warmup', type=int, default=1, help="正式计时前整套语料预跑的轮数")
+    parser.add_argument('--cache', action='store_true', help="启用结果缓存（默认关闭，测量真实搜索耗时）")
+    parser.add_argument('--out', help="把 JSON 结果写入文件（默认打印到标准输出）")
+    parser.add_argument('--compare', help="与之前保存的 JSON 结果对比")
+    args = parser.parse_args()
+
+    # 进度信息输出到标准错误，标准输出只留 JSON
+    results = run_benchmark(args.db, args.repeats, args.warmup, args.cache,
+                            log=lambda message: print(message, file=sys.stderr))
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print(compare(json.load(f), results), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+from multiprocessing import Pool
+from xml.etree import ElementTree as ET
+
+import jamdict
+
+from cedict_index import CEDICT_PATH, build_cedict_index, cedict_path_for
+from gloss_index import build_gloss_index, gloss_path_for
+from ranking import build_feature_table, features_path_for
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+JMD_XML_PATH = os.path.join(APP_DIR, 'JMdict.xml')
+JMD_DB_PATH = os.path.join(APP_DIR, 'JMdict.db')
+
+# 直接使用 Jamdict 自带的建表脚本，生成的数据库与 Jamdict 导入的结构完全一致
+JAMDICT_DATA_DIR = os.path.join(os.path.dirname(jamdict.__file__), 'data')
+SETUP_FILES = ('setup_jmdict.sql', 'setup_kanjidic2.sql', 'setup_jmnedict.sql')
+META_ROWS = (
+    ('jmdict.version', '1.08'),
+    ('jmdict.url', 'http://www.csse.monash.edu.au/~jwb/edict.html'),
+    ('generator', 'jamdict'),
+    ('generator_version', jamdict.__version__),
+    ('generator_url', jamdict.__url__),
+)
+
+XML_LANG = '{http://www.w3.org/XML/1998/namespace}lang'
+# 每个事务写入的词条数；也是并行解析时每个任务的词条数
+CHUNK_SIZE = 5000
+PROGRESS_EVERY = 20000
+
+# 各表的插入语句（带 ID 的表由本脚本分配 ID，与 Jamdict 自增的结果相同）
+INSERT_SQL = {
+    'Entry': "INSERT INTO Entry (idseq) VALUES (?)",
+    'Link': "INSERT INTO Link (idseq, tag, desc, uri) VALUES (?, ?, ?, ?)",
+    'Bib': "INSERT INTO Bib (idseq, tag, text) VALUES (?, ?, ?)",
+    'Etym': "INSERT INTO Etym (idseq, text) VALUES (?, ?)",
+    'Audit': "INSERT INTO Audit (idseq, upd_date, upd_detl) VALUES (?, ?, ?)",
+    'Kanji': "INSERT INTO Kanji (ID, idseq, text) VALUES (?, ?, ?)",
+    'KJI': "INSERT INTO KJI (kid, text) VALUES (?, ?)",
+    'KJP': "INSERT INTO KJP (kid, text) VALUES (?, ?)",
+    'Kana': "INSERT INTO Kana (ID, idseq, text, nokanji) VALUES (?, ?, ?, ?)",
+    'KNI': "INSERT INTO KNI (kid, text) VALUES (?, ?)",
+    'KNP': "INSERT INTO KNP (kid, text) VALUES (?, ?)",
+    'KNR': "INSERT INTO KNR (kid, text) VALUES (?, ?)",
+    'Sense': "INSERT INTO Sense (ID, idseq) VALUES (?, ?)",
+    'SenseSource': "INSERT INTO SenseSource (sid, text, lang, lstype, wasei) VALUES (?, ?, ?, ?, ?)",
+    'SenseGloss': "INSERT INTO SenseGloss (sid, lang, gend, text) VALUES (?, ?, ?, ?)",
+}
+# <sense> 中只有文本的子元素 -> 对应的表
+SENSE_TEXT_TAGS = {
+    'stagk': 'stagk', 'stagr': 'stagr', 'pos': 'pos', 'xref': 'xref', 'ant': 'antonym',
+    'field': 'field', 'misc': 'misc', 's_inf': 'SenseInfo', 'dial': 'dialect',
+}
+for _table in SENSE_TEXT_TAGS.values():
+    INSERT_SQL[_table] = f"INSERT INTO {_table} (sid, text) VALUES (?, ?)"
+
+
+def split_schema(sql):
+    """把建表脚本拆成 (建表语句, 建索引语句)，索引留到数据写完之后再建。"""
+    sql = re.sub(r'/\*.*?\*/', '', sql, flags=re.S)
+    sql = re.sub(r'--[^\n]*', '', sql)
+    tables, indexes = [], []
+    for statement in sql.split(';'):
+        statement = statement.strip()
+        if not statement:
+            continue
+        if statement.upper().startswith('CREATE INDEX'):
+            indexes.append(statement)
+        elif statement.upper().startswith('CREATE'):
+            tables.append(statement)
+    return tables, indexes
+
+
+def load_schema():
+    tables, indexes = [], []
+    for name in SETUP_FILES:
+        with open(os.path.join(JAMDICT_DATA_DIR, name), encoding='utf-8') as f:
+            t, i = split_schema(f.read())
+        tables += t
+        indexes += i
+    return tables, indexes
+
+
+# --- 解析 ---
+def parse_entry(elem):
+    """
+    把一个 <entry> 元素解析成只含基本类型的元组（可以在进程间传递）：
+    (idseq, links, bibs, etyms, audits, kanjis, kanas, senses)。
+    各字段的取值方式与 Jamdict 的 JMDictXMLParser 一致。
+    """
+    idseq = None
+    links, bibs, etyms, audits, kanjis, kanas, senses = [], [], [], [], [], [], []
+    for child in elem:
+        tag = child.tag
+        if tag == 'ent_seq':
+            idseq = int(child.text)
+        elif tag == 'k_ele':
+            text, info, pri = None, [], []
+            for c in child:
+                if c.tag == 'keb': text = c.text
+                elif c.tag == 'ke_inf': info.append(c.text)
+                elif c.tag == 'ke_pri': pri.append(c.text)
+            kanjis.append((text, info, pri))
+        elif tag == 'r_ele':
+            text, nokanji, info, pri, restr = None, False, [], [], []
+            for c in child:
+                if c.tag == 'reb': text = c.text
+                elif c.tag == 're_nokanji': nokanji = True
+                elif c.tag == 're_inf': info.append(c.text)
+                elif c.tag == 're_pri': pri.append(c.text)
+                elif c.tag == 're_restr': restr.append(c.text)
+            kanas.append((text, nokanji, info, pri, restr))
+        elif tag == 'info':
+            for c in child:
+                if c.tag == 'links':
+                    links.append((c.findtext('link_tag'), c.findtext('link_desc'), c.findtext('link_uri')))
+                elif c.tag == 'bibl':
+                    bibs.append((c.findtext('bib_tag', ''), c.findtext('bib_txt', '')))
+                elif c.tag == 'etym':
+                    etyms.append(c.text)
+                elif c.tag == 'audit':
+                    audits.append((c.findtext('upd_date'), c.findtext('upd_detl')))
+        elif tag == 'sense':
+            texts, sources, glosses = [], [], []
+            for c in child:
+                if c.tag in SENSE_TEXT_TAGS:
+                    texts.append((SENSE_TEXT_TAGS[c.tag], c.text))
+                elif c.tag == 'lsource':
+                    sources.append((c.text, c.get(XML_LANG, ''), c.get('ls_type', ''), c.get('ls_wasei', '')))
+                elif c.tag == 'gloss':
+                    glosses.append((c.get(XML_LANG, ''), c.get('g_gend', ''), c.text))
+            senses.append((texts, sources, glosses))
+    return idseq, links, bibs, etyms, audits, kanjis, kanas, senses
+
+
+def parse_entry_chunk(chunk):
+    """并行模式下在子进程中执行：把序列化的 <entry> 重新解析成元组。"""
+    return [parse_entry(ET.fromstring(data)) for data in chunk]
+
+
+def iter_entry_elements(xml_path):
+    """
+    流式读取 JMdict.xml，逐个产出 <entry> 元素。
+    处理完的元素会被清空并从根节点上移除，内存占用与文件大小无关。
+    DTD 中定义的实体（例如 &v1;）由解析器展开成说明文字，与 Jamdict 导入的结果一致。
+    """
+    context = ET.iterparse(xml_path, events=('start', 'end'))
+    _, root = next(context)
+    for event, elem in context:
+        if event == 'end' and elem.tag == 'entry':
+            yield elem
+            elem.clear()
+            root.clear()
+
+
+def iter_chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_parsed_chunks(xml_path, workers):
+    """按 CHUNK_SIZE 分块产出解析好的词条；workers > 1 时把解析分给多个子进程，顺序保持不变。"""
+    if workers <= 1:
+        yield from iter_chunks((parse_entry(elem) for elem in iter_entry_elements(xml_path)), CHUNK_SIZE)
+        return
+    raw_chunks = iter_chunks((ET.tostring(elem) for elem in iter_entry_elements(xml_path)), CHUNK_SIZE)
+    with Pool(workers) as pool:
+        yield from pool.imap(parse_entry_chunk, raw_chunks)
+
+
+# --- 写入 ---
+class RowBuffer:
+    """把解析好的词条展开成各表的行，并按 Jamdict 的自增顺序分配 Kanji/Kana/Sense 的 ID。"""
+
+    def __init__(self):
+        self.rows = {table: [] for table in INSERT_SQL}
+        self.kanji_id = 0
+        self.kana_id = 0
+        self.sense_id = 0
+
+    def add(self, entry):
+        idseq, links, bibs, etyms, audits, kanjis, kanas, senses = entry
+        rows = self.rows
+        rows['Entry'].append((idseq,))
+        rows['Link'] += [(idseq, *link) for link in links]
+        rows['Bib'] += [(idseq, *bib) for bib in bibs]
+        rows['Etym'] += [(idseq, etym) for etym in etyms]
+        rows['Audit'] += [(idseq, *audit) for audit in audits]
+        for text, info, pri in kanjis:
+            self.kanji_id += 1
+            kid = self.kanji_id
+            rows['Kanji'].append((kid, idseq, text))
+            rows['KJI'] += [(kid, t) for t in info]
+            rows['KJP'] += [(kid, t) for t in pri]
+        for text, nokanji, info, pri, restr in kanas:
+            self.kana_id += 1
+            kid = self.kana_id
+            rows['Kana'].append((kid, idseq, text, nokanji))
+            rows['KNI'] += [(kid, t) for t in info]
+            rows['KNP'] += [(kid, t) for t in pri]
+            rows['KNR'] += [(kid, t) for t in restr]
+        for texts, sources, glosses in senses:
+            self.sense_id += 1
+            sid = self.sense_id
+            rows['Sense'].append((sid, idseq))
+            for table, text in texts:
+                rows[table].append((sid, text))
+            rows['SenseSource'] += [(sid, *source) for source in sources]
+            rows['SenseGloss'] += [(sid, *gloss) for gloss in glosses]
+
+    def flush(self, conn):
+        """在一个事务中批量写入当前缓存的所有行。"""
+        with conn:
+            for table, rows in self.rows.items():
+                if rows:
+                    conn.executemany(INSERT_SQL[table], rows)
+                    rows.clear()
+
+
+def build_jmdict(xml_path=JMD_XML_PATH, db_path=JMD_DB_PATH, workers=1, log=print):
+    """
+    从 JMdict.xml 生成 Jamdict 可以直接使用的数据库：
+    流式解析 + 大事务批量插入，写完数据之后再建索引。
+    先写到临时文件，完成后再替换 db_path，正在运行的应用不会读到写了一半的数据库。
+    返回 {阶段: 用时(秒)} 以及词条数。
+    """
+    tmp_path = db_path + '.building'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    tables, indexes = load_schema()
+    timings = {}
+    start = time.time()
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        # 生成过程中不需要回滚日志和落盘同步，出错时整个临时文件直接丢弃
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA cache_size=-200000")
+        for statement in tables:
+            conn.execute(statement)
+        conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", META_ROWS)
+        conn.commit()
+
+        buffer = RowBuffer()
+        count = 0
+        next_report = PROGRESS_EVERY
+        for chunk in iter_parsed_chunks(xml_path, workers):
+            for entry in chunk:
+                buffer.add(entry)
+            buffer.flush(conn)
+            count += len(chunk)
+            if count >= next_report:
+                elapsed = time.time() - start
+                log(f"已导入 {count} 个词条（{elapsed:.1f} 秒，{count / elapsed:.0f} 条/秒）")
+                next_report += PROGRESS_EVERY
+        timings['load'] = time.time() - start
+        log(f"词条导入完成：共 {count} 个，用时 {timings['load']:.1f} 秒")
+
+        index_start = time.time()
+        with conn:
+            for statement in indexes:
+                conn.execute(statement)
+        timings['index'] = time.time() - index_start
+        log(f"索引创建完成，用时 {timings['index']:.1f} 秒")
+    except BaseException:
+        conn.close()
+        os.remove(tmp_path)
+        raise
+    conn.close()
+
+    os.replace(tmp_path, db_path)
+    timings['total'] = time.time() - start
+    return count, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="从 JMdict.xml 快速生成 Jamdict 词典数据库")
+    parser.add_argument('--xml', default=JMD_XML_PATH, help="JMdict.xml 路径")
+    parser.add_argument('--db', default=JMD_DB_PATH, help="输出的数据库路径（已存在时会被替换）")
+    parser.add_argument('--workers', type=int, default=1, help="并行解析的进程数，默认 1（不启用多进程）")
+    parser.add_argument('--skip-features', action='store_true', help="不重新生成排序特征表、释义全文索引和中文词链接表")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.xml):
+        print(f"错误：找不到 '{args.xml}' 文件。")
+        sys.exit(1)
+
+    print(f"读取: {args.xml}")
+    print(f"输出: {args.db}")
+    count, timings = build_jmdict(args.xml, args.db, args.workers)
+
+    # 排序特征表、释义全文索引和中文词链接表由词典数据库派生，词典更新后需要一起重新生成
+    if not args.skip_features:
+        start = time.time()
+        build_feature_table(args.db, features_path_for(args.db))
+        timings['features'] = time.time() - start
+        print(f"排序特征表已更新，用时 {timings['features']:.1f} 秒")
+        start = time.time()
+        build_gloss_index(args.db, gloss_path_for(args.db))
+        timings['gloss'] = time.time() - start
+        print(f"释义全文索引已更新，用时 {timings['gloss']:.1f} 秒")
+        # CC-CEDICT 是可选数据，没有 dic/cedict_ts.u8 时跳过
+        if os.path.exists(CEDICT_PATH):
+            start = time.time()
+            build_cedict_index(args.db, CEDICT_PATH, cedict_path_for(args.db))
+            timings['cedict'] = time.time() - start
+            print(f"中文词链接表已更新，用时 {timings['cedict']:.1f} 秒")
+
+    size_mb = os.path.getsize(args.db) / (1024 * 1024)
+    print(f"完成：{count} 个词条，{size_mb:.1f} MB，总用时 {timings['total'] + timings.get('features', 0) + timings.get('gloss', 0) + timings.get('cedict', 0):.1f} 秒")
+
+
+if __name__ == "__main__":
+    main()
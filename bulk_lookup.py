@@ -0,0 +1,140 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+
+from search_engine import JMD_DB_PATH, SearchEngine
+
+# 每个词最多输出的词条数（每个层级）
+DEFAULT_LIMIT = 5
+# 每次交给一个进程的词数
+DEFAULT_CHUNK = 64
+
+# 工作进程中的搜索引擎
+_engine = None
+
+
+def _init_worker(db_path):
+    """
+    工作进程的初始化：fork 启动时直接沿用父进程已经构建好的引擎（写时复制，不重复加载索引），
+    其余启动方式在每个进程里各自构建一次。数据库连接都是在进程内查询时才打开的。
+    """
+    global _engine
+    if _engine is None:
+        _engine = SearchEngine.from_db(db_path)
+
+
+def lookup(engine, line_no, word, limit):
+    """搜索一个词，返回一行 JSONL 对应的字典（只含词条内容，不含调试信息）。"""
+    try:
+        data = engine.search(word).to_dict(engine, 0, limit)
+    except Exception as e:
+        return {'line': line_no, 'query': word, 'error': str(e)}
+    del data['debug_log'], data['trace']
+    return dict(line=line_no, **data)
+
+
+def _lookup_chunk(chunk, limit):
+    """返回 (JSONL 行列表, 其中出错的行数)。"""
+    rows = [lookup(_engine, line_no, word, limit) for line_no, word in chunk]
+    return [json.dumps(row, ensure_ascii=False) for row in rows], sum(1 for row in rows if 'error' in row)
+
+
+def read_words(lines):
+    """逐行读取词表：每行取第一列（制表符分隔），跳过空行和 # 开头的注释，产生 (行号, 词)。"""
+    for line_no, line in enumerate(lines, 1):
+        word = line.split('\t', 1)[0].strip()
+        if word and not word.startswith('#'):
+            yield line_no, word
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def bulk_lookup(lines, out, db_path=JMD_DB_PATH, workers=None, limit=DEFAULT_LIMIT, chunk_size=DEFAULT_CHUNK):
+    """
+    批量查词，按输入顺序把结果逐行写成 JSONL，返回 (处理的词数, 出错的词数, 查词用时)。
+    出错的词也会输出一行（带 error 字段），但单独计数，不算作成功的吞吐量。
+    同时在途的块数不超过进程数的几倍，因此无论词表多大，内存占用都是有上限的。
+    workers 为 0 时在当前进程中逐个查找。
+    """
+    words = read_words(lines)
+    count = errors = 0
+    if workers == 0:
+        _init_worker(db_path)
+        start = time.time()
+        for chunk in _chunks(words, chunk_size):
+            rows, failed = _lookup_chunk(chunk, limit)
+            for row in rows:
+                out.write(row + "\n")
+            count += len(chunk)
+            errors += failed
+        return count, errors, time.time() - start
+
+    workers = workers or os.cpu_count() or 1
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    if ctx.get_start_method() == 'fork':
+        _init_worker(db_path)
+    # 查词用时从进程池启动算起（非 fork 启动时包含各进程构建引擎的时间）
+    start = time.time()
+    window = deque()
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(db_path,)) as pool:
+        for chunk in _chunks(words, chunk_size):
+            window.append((len(chunk), pool.apply_async(_lookup_chunk, (chunk, limit))))
+            while len(window) >= workers * 4:
+                written, failed = _write_next(window, out)
+                count += written
+                errors += failed
+        while window:
+            written, failed = _write_next(window, out)
+            count += written
+            errors += failed
+    return count, errors, time.time() - start
+
+
+def _write_next(window, out):
+    size, pending = window.popleft()
+    rows, failed = pending.get()
+    for row in rows:
+        out.write(row + "\n")
+    return size, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量查词：逐行读取词表，按输入顺序输出 JSONL")
+    parser.add_argument('input', nargs='?', default='-', help="词表文件，每行一个词（默认从标准输入读取）")
+    parser.add_argument('-o', '--output', default='-', help="输出的 JSONL 文件（默认写到标准输出）")
+    parser.add_argument('--db', default=JMD_DB_PATH, help="Jamdict 词典数据库路径")
+    parser.add_argument('--workers', type=int, default=None, help="进程数，默认等于 CPU 核数；0 表示不启用多进程")
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help="每个层级最多输出的词条数")
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK, help="每次交给一个进程的词数")
+    args = parser.parse_args()
+
+    src = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        count, errors, elapsed = bulk_lookup(src, out, args.db, args.workers, args.limit, args.chunk)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if out is not sys.stdout:
+            out.close()
+    ok = count - errors
+    print(f"完成：{count} 行（成功 {ok}，出错 {errors}），用时 {elapsed:.1f} 秒，"
+          f"{ok / elapsed if elapsed else 0:.1f} 行/秒", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
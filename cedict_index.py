@@ -0,0 +1,204 @@
+import argparse
+import os
+import re
+import sqlite3
+import time
+
+from gloss_index import index_version, normalize_gloss
+from read_pool import ReadPool
+from zh_convert import load_translation_table, replace_zh_to_jp
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+CEDICT_PATH = os.path.join(APP_DIR, 'dic', 'cedict_ts.u8')
+
+# 每个中文词最多保存的 JMdict 链接数
+LINK_LIMIT = 10
+# 链接分数：汉字形式完全相同并且释义有重合的基础分；只有部分汉字相同时按释义重合再加分
+FORM_MATCH_SCORE = 10.0
+# 汉字形式相同但释义没有任何重合（可能是同形异义词）时的分数，低于所有按释义找到的链接
+UNCONFIRMED_FORM_SCORE = 0.5
+# 已有确认的形式链接时，按释义找到的候选不超过这么多个才一并保留
+GLOSS_LINKS_WITH_FORM = 3
+# 链接表格式的版本号（写在 user_version 中），旧版本生成的链接表在有 CC-CEDICT 数据时重新生成
+INDEX_VERSION = 4
+
+# 繁體 简体 [pin1 yin1] /释义1/释义2/
+_LINE_RE = re.compile(r'^(\S+) (\S+) \[([^\]]*)\] /(.*)/\s*$')
+# 不参与释义比较的 CC-CEDICT 释义：量词、异体字/参见说明、姓氏等
+_SKIP_GLOSS_RE = re.compile(r'^(CL:|variant of |old variant of |see |see also |surname |abbr\. for |used in )')
+_HAN_RE = re.compile(r'[㐀-䶿一-鿿豈-﫿]')
+
+
+def cedict_path_for(db_path):
+    """中文词到 JMdict 的链接表存放在词典数据库旁边，例如 JMdict.db -> JMdict_cedict.db。"""
+    return os.path.splitext(db_path)[0] + '_cedict.db'
+
+
+def parse_cedict(path=CEDICT_PATH):
+    """逐行读取 CC-CEDICT（与 temp/test_cccedict.py 相同的格式），产生 (繁体, 简体, 拼音, 释义列表)。"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('#'):
+                continue
+            m = _LINE_RE.match(line.strip())
+            if m:
+                traditional, simplified, pinyin, meanings = m.groups()
+                yield traditional, simplified, pinyin, meanings.split('/')
+
+
+def _gloss_keys(glosses):
+    """释义比较用的形式（与 gloss_index.normalize_gloss 相同），去掉量词等说明性的释义。"""
+    return {normalize_gloss(g) for g in glosses if g and not _SKIP_GLOSS_RE.match(g)} - {''}
+
+
+def _load_jmdict(db_path):
+    """读取 JMdict 的汉字形式 -> idseq 和英文释义 -> idseq 两张映射。"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        kanji_forms = {}
+        entry_chars = {}
+        for text, idseq in conn.execute("SELECT text, idseq FROM Kanji"):
+            kanji_forms.setdefault(text, set()).add(idseq)
+            entry_chars.setdefault(idseq, set()).update(_HAN_RE.findall(text))
+        glosses = {}
+        cursor = conn.execute(
+            "SELECT SenseGloss.text, Sense.idseq FROM SenseGloss JOIN Sense ON SenseGloss.sid = Sense.ID "
+            "WHERE SenseGloss.lang IS NULL OR SenseGloss.lang = 'eng'"
+        )
+        for text, idseq in cursor:
+            glosses.setdefault(normalize_gloss(text), set()).add(idseq)
+        return kanji_forms, entry_chars, glosses
+    finally:
+        conn.close()
+
+
+def compute_links(db_path, cedict_path=CEDICT_PATH):
+    """
+    离线计算每个 CC-CEDICT 词条对应的 JMdict 词条：
+    - 简体、繁体，或逐字转成日文汉字后的形式与 JMdict 的汉字形式完全相同，并且英文释义有重合：直接链接；
+    - 其次取英文释义有重合、并且至少有一个相同汉字（转换后）的 JMdict 词条，
+      例如 自行车 (bicycle) -> 自転車 (bicycle)、火车 (train) -> 汽車、列車；
+      形式相同但释义没有重合的词条（手纸 -> 手紙 letter）仍然保留，但排在这些链接之后。
+      已有确认的形式链接时，只在按释义找到的候选很少时才一并保留（火车 -> 火車，以及 電車、汽車、列車）。
+    返回 (CC-CEDICT 词条行, 链接行)；链接行是 (中文词, idseq, 分数)，简体和繁体各一份。
+    """
+    kanji_forms, entry_chars, glosses = _load_jmdict(db_path)
+    # 两张表都以 t2jp 结尾（转成日文新字体）；'Traditional' 表只做 hk2t，不能用于繁体词
+    tables = (load_translation_table('Simplified'), load_translation_table('Taiwan Traditional'))
+    entries = []
+    links = {}
+    for cid, (traditional, simplified, pinyin, meanings) in enumerate(parse_cedict(cedict_path)):
+        entries.append((cid, traditional, simplified, pinyin, '/'.join(m for m in meanings if m)))
+        forms = {traditional, simplified,
+                 replace_zh_to_jp(simplified, tables[0]), replace_zh_to_jp(traditional, tables[1])}
+        form_ids = {idseq for form in forms for idseq in kanji_forms.get(form, ())}
+        chars = set(_HAN_RE.findall("".join(forms)))
+        overlap = {}
+        if chars:
+            for key in _gloss_keys(meanings):
+                for idseq in glosses.get(key, ()):
+                    overlap[idseq] = overlap.get(idseq, 0) + 1
+        # 汉字形式相同并且释义也有重合时才确认链接；释义没有重合的是同形异义词（手纸 -> 手紙），分数很低
+        scores = {idseq: FORM_MATCH_SCORE + overlap[idseq] if overlap.get(idseq) else UNCONFIRMED_FORM_SCORE
+                  for idseq in form_ids}
+        # 按释义找到的链接：分数都低于确认的形式链接。已有确认的形式链接时，只有候选很少（释义足够具体，
+        # 火车 的 train -> 電車、汽車、列車）才保留；学校 的 school 对应到 学派、学舎 等许多词条，只是噪声
+        gloss_scores = {}
+        for idseq, shared in overlap.items():
+            common_chars = chars & entry_chars.get(idseq, set())
+            if common_chars and idseq not in scores:
+                gloss_scores[idseq] = shared + len(common_chars) / len(chars)
+        confirmed = any(overlap.get(idseq) for idseq in form_ids)
+        if not confirmed or len(gloss_scores) <= GLOSS_LINKS_WITH_FORM:
+            scores.update(gloss_scores)
+        if not scores:
+            continue
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:LINK_LIMIT]
+        for word in {traditional, simplified}:
+            bucket = links.setdefault(word, {})
+            for idseq, score in best:
+                if score > bucket.get(idseq, 0):
+                    bucket[idseq] = score
+    rows = [(word, idseq, score) for word, bucket in links.items() for idseq, score in bucket.items()]
+    return entries, rows
+
+
+def build_cedict_index(db_path, cedict_path=CEDICT_PATH, out_path=None):
+    """运行离线计算并把 CC-CEDICT 词条和链接表写入 *_cedict.db，查找时按中文词走主键索引。"""
+    out_path = out_path or cedict_path_for(db_path)
+    entries, links = compute_links(db_path, cedict_path)
+    tmp_path = out_path + '.building'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute('''CREATE TABLE cedict
+                        (id INTEGER PRIMARY KEY, traditional TEXT, simplified TEXT, pinyin TEXT, meanings TEXT)''')
+        conn.execute('''CREATE TABLE links
+                        (word TEXT, idseq INTEGER, score REAL, PRIMARY KEY (word, idseq)) WITHOUT ROWID''')
+        conn.executemany("INSERT INTO cedict VALUES (?, ?, ?, ?, ?)", entries)
+        conn.executemany("INSERT INTO links VALUES (?, ?, ?)", links)
+        conn.execute("CREATE INDEX cedict_simplified ON cedict (simplified)")
+        conn.execute("CREATE INDEX cedict_traditional ON cedict (traditional)")
+        conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+class CedictIndex:
+    """
+    中文词 -> JMdict 词条的链接表（只读，查询时从只读连接池中借用连接）。
+    一次主键查找就能把 自行车 这类逐字转换找不到的中文词对应到 自転車。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._pool = ReadPool(path)
+
+    @classmethod
+    def load(cls, db_path, cedict_path=CEDICT_PATH):
+        """
+        打开 db_path 对应的链接表；还没有生成过或格式版本过旧时用 dic/cedict_ts.u8 生成一次。
+        两者都没有时返回 None（中文词义匹配不可用，其余搜索不受影响）。
+        """
+        path = cedict_path_for(db_path)
+        if not os.path.exists(path) or index_version(path) != INDEX_VERSION:
+            if not os.path.exists(cedict_path):
+                return cls(path) if os.path.exists(path) else None
+            build_cedict_index(db_path, cedict_path, path)
+        return cls(path)
+
+    def lookup(self, word):
+        """返回与中文词 word 对应的 idseq 列表，链接分数高的在前。"""
+        with self._pool.connection() as conn:
+            cursor = conn.execute("SELECT idseq FROM links WHERE word = ? ORDER BY score DESC, idseq", (word,))
+            return [idseq for (idseq,) in cursor]
+
+    def meanings(self, word):
+        """CC-CEDICT 中 word 的 (拼音, 释义) 列表，供调试面板显示。"""
+        with self._pool.connection() as conn:
+            return conn.execute(
+                "SELECT pinyin, meanings FROM cedict WHERE simplified = ? OR traditional = ?", (word, word)
+            ).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把 CC-CEDICT 导入索引表，并预先计算中文词到 JMdict 词条的链接")
+    parser.add_argument('db', help="Jamdict 词典数据库路径，例如 JMdict.db")
+    parser.add_argument('--cedict', default=CEDICT_PATH, help="cedict_ts.u8 路径")
+    parser.add_argument('--out', help="输出路径，默认与数据库同目录的 *_cedict.db")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.cedict):
+        print(f"错误：找不到 '{args.cedict}' 文件。")
+        raise SystemExit(1)
+    start = time.time()
+    out_path = build_cedict_index(args.db, args.cedict, args.out)
+    print(f"中文词链接表已写入 {out_path}，用时 {time.time() - start:.1f} 秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import sqlite3
+from collections import namedtuple
+
+# 词形的类别（位掩码）。规则的 rules_in 是活用后的形式所属的类别，rules_out 是还原出的形式的类别；
+# TE/MASU/PAST 是还没还原到辞书形的中间形式（例如 食べていた -> 食べている -> 食べて -> 食べる）
+V1 = 1
+V5 = 2
+VK = 4
+VS = 8
+ADJ_I = 16
+TE = 32
+MASU = 64
+PAST = 128
+# サ变名词（勉強 + する），只用于验证，不出现在规则中
+VS_NOUN = 256
+
+DICTIONARY_FORMS = V1 | V5 | VK | VS | ADJ_I
+
+# JMdict 词性（代码或 Jamdict 数据库中展开后的说明文字）-> 类别
+POS_TYPES = {
+    'v1': V1, 'v1-s': V1, 'Ichidan verb': V1, 'Ichidan verb - kureru special class': V1,
+    'vk': VK, 'Kuru verb - special class': VK,
+    'vs-i': VS, 'vs-s': VS, 'suru verb - included': VS, 'suru verb - special class': VS,
+    'vs': VS_NOUN, 'noun or participle which takes the aux. verb suru': VS_NOUN,
+    'adj-i': ADJ_I, 'adj-ix': ADJ_I, 'adjective (keiyoushi)': ADJ_I, 'adjective (keiyoushi) - yoi/ii class': ADJ_I,
+}
+
+
+def pos_type(pos):
+    """把一个词性归到上面的类别，五段动词按代码前缀 v5 或说明文字 Godan verb 判断；其余返回 0。"""
+    if pos in POS_TYPES:
+        return POS_TYPES[pos]
+    if pos.startswith('v5') or pos.startswith('Godan verb'):
+        return V5
+    return 0
+
+
+# priority：同样长的活用路径中优先采用的规则（例如 行った 的 行く 专用规则优先于一般的 う -> った）
+Rule = namedtuple('Rule', 'kana_in kana_out rules_in rules_out reason priority', defaults=(0,))
+
+# 五段动词：辞书形词尾 -> (あ段, い段, え段, お段, て形, た形)
+_GODAN = {
+    'う': ('わ', 'い', 'え', 'お', 'って', 'った'),
+    'く': ('か', 'き', 'け', 'こ', 'いて', 'いた'),
+    'ぐ': ('が', 'ぎ', 'げ', 'ご', 'いで', 'いだ'),
+    'す': ('さ', 'し', 'せ', 'そ', 'して', 'した'),
+    'つ': ('た', 'ち', 'て', 'と', 'って', 'った'),
+    'ぬ': ('な', 'に', 'ね', 'の', 'んで', 'んだ'),
+    'ぶ': ('ば', 'び', 'べ', 'ぼ', 'んで', 'んだ'),
+    'む': ('ま', 'み', 'め', 'も', 'んで', 'んだ'),
+    'る': ('ら', 'り', 'れ', 'ろ', 'って', 'った'),
+}
+# 行く 的て形/た形不规则：いって/いった。行った 也符合 行う 的一般规则，所以这些规则优先
+_IKU = ('いく', '行く', '逝く', '往く')
+
+
+def _verb_rules(reason, rules_in, ichidan, godan, suru, kuru, rules_out_v1=V1):
+    """
+    一种活用对四类动词的规则：ichidan 是接在一段动词词干后的词尾，
+    godan(row) 从 _GODAN 的一行得到五段动词的词尾，suru/kuru 是 する/くる 的整词活用形。
+    """
+    rules = []
+    if ichidan is not None:
+        rules.append(Rule(ichidan, 'る', rules_in, rules_out_v1, reason))
+    for base, row in _GODAN.items():
+        rules.append(Rule(godan(row), base, rules_in, V5, reason))
+    if suru is not None:
+        rules.append(Rule(suru, 'する', rules_in, VS, reason))
+    if kuru is not None:
+        rules.append(Rule(kuru, 'くる', rules_in, VK, reason))
+        rules.append(Rule('来' + kuru[1:], '来る', rules_in, VK, reason))
+    return rules
+
+
+def _build_rules():
+    rules = []
+    # 否定：ない 本身按い形容词活用（なかった、なくて）
+    rules += _verb_rules('否定', ADJ_I, 'ない', lambda r: r[0] + 'ない', 'しない', 'こない')
+    rules.append(Rule('くない', 'い', ADJ_I, ADJ_I, '否定'))
+    # 过去（たら/たり 先还原成 た）
+    rules += _verb_rules('过去', PAST, 'た', lambda r: r[5], 'した', 'きた')
+    rules += [Rule(iku[:-1] + 'った', iku, PAST, V5, '过去', 1) for iku in _IKU]
+    rules.append(Rule('かった', 'い', PAST, ADJ_I, '过去'))
+    for ending in ('ら', 'り'):
+        rules.append(Rule('た' + ending, 'た', 0, PAST, '条件' if ending == 'ら' else '列举'))
+        rules.append(Rule('だ' + ending, 'だ', 0, PAST, '条件' if ending == 'ら' else '列举'))
+    # て形，以及接在て形后面的补助动词
+    rules += _verb_rules('て形', TE, 'て', lambda r: r[4], 'して', 'きて')
+    rules += [Rule(iku[:-1] + 'って', iku, TE, V5, 'て形', 1) for iku in _IKU]
+    rules.append(Rule('くて', 'い', TE, ADJ_I, 'て形'))
+    for te in ('て', 'で'):
+        rules.append(Rule(te + 'いる', te, V1, TE, '进行'))
+        rules.append(Rule(te + 'る', te, V1, TE, '进行'))
+        rules.append(Rule(te + 'しまう', te, V5, TE, '完了'))
+        rules.append(Rule(te + 'おく', te, V5, TE, '准备'))
+        rules.append(Rule(te + 'ください', te, 0, TE, '请求'))
+    rules.append(Rule('ちゃう', 'て', V5, TE, '完了'))
+    rules.append(Rule('じゃう', 'で', V5, TE, '完了'))
+    # ます形（ました/ません/ましょう 先还原成 ます）
+    rules += _verb_rules('ます形', MASU, 'ます', lambda r: r[1] + 'ます', 'します', 'きます')
+    for ending, reason in (('ました', '过去'), ('ません', '否定'), ('ませんでした', '否定过去'),
+                           ('ましょう', '意志'), ('まして', 'て形')):
+        rules.append(Rule(ending, 'ます', 0, MASU, reason))
+    # 愿望：たい 按い形容词活用
+    rules += _verb_rules('愿望', ADJ_I, 'たい', lambda r: r[1] + 'たい', 'したい', 'きたい')
+    # 可能/被动/使役：活用后的形式都按一段动词活用
+    rules += _verb_rules('可能', V1, 'られる', lambda r: r[2] + 'る', 'できる', 'こられる')
+    rules.append(Rule('これる', 'くる', V1, VK, '可能'))
+    rules += _verb_rules('被动', V1, None, lambda r: r[0] + 'れる', 'される', None)
+    rules += _verb_rules('使役', V1, 'させる', lambda r: r[0] + 'せる', 'させる', 'こさせる')
+    # 意志、假定、命令：只出现在词尾
+    rules += _verb_rules('意志', 0, 'よう', lambda r: r[3] + 'う', 'しよう', 'こよう')
+    rules += _verb_rules('假定', 0, 'れば', lambda r: r[2] + 'ば', 'すれば', 'くれば')
+    rules.append(Rule('ければ', 'い', 0, ADJ_I, '假定'))
+    rules += _verb_rules('命令', 0, 'ろ', lambda r: r[2], 'しろ', 'こい')
+    rules.append(Rule('よ', 'る', 0, V1, '命令'))
+    rules.append(Rule('せよ', 'する', 0, VS, '命令'))
+    # い形容词的副词形、名词化
+    rules.append(Rule('く', 'い', 0, ADJ_I, '副词形'))
+    rules.append(Rule('さ', 'い', 0, ADJ_I, '名词化'))
+    return rules
+
+
+RULES = _build_rules()
+
+
+def _build_suffix_trie(rules):
+    """
+    把所有规则按活用词尾倒序编进一棵字典树：从词的最后一个字符往前走一遍，
+    沿途节点上的规则就是词尾匹配的全部规则，不需要逐条比较。
+    每个节点是 [{字符: 子节点}, 在这里结束的规则列表]。
+    """
+    root = [{}, []]
+    for rule in rules:
+        node = root
+        for c in reversed(rule.kana_in):
+            node = node[0].setdefault(c, [{}, []])
+        node[1].append(rule)
+    return root
+
+
+_SUFFIX_TRIE = _build_suffix_trie(RULES)
+# 还原的最大层数（例如 食べさせられなかった 需要 4 层）
+MAX_DEPTH = 6
+
+
+def deinflect(word):
+    """
+    按规则把 word 还原成可能的辞书形，返回 [(候选形式, 类别, 活用路径, 优先级), ...]，
+    活用路径按从辞书形到 word 的顺序排列，例如 食べなかった -> ('食べる', V1, ('否定', '过去'), 0)；
+    优先级是路径上各规则 priority 的最大值。
+    候选形式只是按词尾推出来的，需要再用词典验证。
+    """
+    results = []
+    seen = {(word, 0)}
+    queue = [(word, 0, (), 0)]
+    while queue:
+        term, types, reasons, priority = queue.pop()
+        if types:
+            results.append((term, types, reasons, priority))
+        if len(reasons) >= MAX_DEPTH:
+            continue
+        node = _SUFFIX_TRIE
+        for i in range(len(term) - 1, -1, -1):
+            node = node[0].get(term[i])
+            if node is None:
+                break
+            for rule in node[1]:
+                if types and not types & rule.rules_in:
+                    continue
+                candidate = term[:i] + rule.kana_out
+                key = (candidate, rule.rules_out)
+                if key not in seen:
+                    seen.add(key)
+                    queue.append((candidate, rule.rules_out, (rule.reason,) + reasons, max(priority, rule.priority)))
+    return results
+
+
+class Deinflector:
+    """
+    活用形还原：规则推出的候选辞书形在一张只含动词/い形容词/サ变名词的 形式 -> [(idseq, 类别)] 表中
+    一次批量验证，只保留词性与规则相符的词条（例如 食べた 只接受一段动词 食べる）。
+    """
+
+    def __init__(self, rows):
+        # rows: (形式, idseq, 类别)
+        self.forms = {}
+        for text, idseq, types in rows:
+            self.forms.setdefault(text, []).append((idseq, types))
+
+    @classmethod
+    def from_db(cls, db_path):
+        """读取 Jamdict 数据库中的词性表，只为能活用的词条建立形式表。"""
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            entry_types = {}
+            type_cache = {}
+            for idseq, pos in conn.execute("SELECT Sense.idseq, pos.text FROM pos JOIN Sense ON pos.sid = Sense.ID"):
+                if pos not in type_cache:
+                    type_cache[pos] = pos_type(pos)
+                if type_cache[pos]:
+                    entry_types[idseq] = entry_types.get(idseq, 0) | type_cache[pos]
+            rows = [
+                (text, idseq, entry_types[idseq])
+                for text, idseq in conn.execute("SELECT text, idseq FROM Kanji UNION ALL SELECT text, idseq FROM Kana")
+                if idseq in entry_types
+            ]
+            return cls(rows)
+        finally:
+            conn.close()
+
+    def __len__(self):
+        return len(self.forms)
+
+    def _matches(self, term, types):
+        for idseq, entry_types in self.forms.get(term, ()):
+            if entry_types & types:
+                yield idseq
+        # サ变动词：勉強した -> 勉強する -> 勉強（サ变名词）
+        if types & VS and term.endswith('する') and len(term) > 2:
+            for idseq, entry_types in self.forms.get(term[:-2], ()):
+                if entry_types & VS_NOUN:
+                    yield idseq
+
+    def _lookup(self, word):
+        """{idseq: (idseq, 辞书形, 活用路径, 优先级)}，同一词条只保留最短（同样短时优先级最高）的活用路径。"""
+        best = {}
+        for term, types, reasons, priority in deinflect(word):
+            if not types & DICTIONARY_FORMS:
+                continue
+            for idseq in self._matches(term, types):
+                if idseq not in best or (len(reasons), -priority) < (len(best[idseq][2]), -best[idseq][3]):
+                    best[idseq] = (idseq, term, reasons, priority)
+        return best
+
+    def lookup(self, word):
+        """返回 [(idseq, 辞书形, 活用路径), ...]，同一词条只保留最短的活用路径。"""
+        return [match[:3] for match in self._lookup(word).values()]
+
+    def ranked(self, word, sort_key):
+        """
+        lookup() 的结果按 活用路径长度 -> 规则优先级 -> sort_key(idseq, 辞书形长度) 排好序，
+        例如 行った 的 行く 排在 行う 之前。sort_key 一般是 RankFeatures.sort_key。
+        """
+        matches = sorted(self._lookup(word).values(), key=lambda m: (len(m[2]), -m[3], sort_key(m[0], len(m[1]))))
+        return [match[:3] for match in matches]
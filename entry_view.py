@@ -0,0 +1,113 @@
+import sys
+import threading
+
+# 每条 SQL 的 IN (...) 最多放多少个 idseq（低于 SQLite 的参数个数上限）
+_BATCH = 500
+
+
+def gloss_text(lang, gend, text):
+    """与 Jamdict 的 str(SenseGloss) 相同：非英语释义附上语言，有性别时附上性别。"""
+    parts = [text]
+    if lang and lang != 'eng':
+        parts.append(f'(lang:{lang})')
+    if gend:
+        parts.append(f'(gend:{gend})')
+    return ' '.join(parts)
+
+
+class EntryView:
+    """
+    显示用的紧凑词条：只有 idseq、词头（第一个汉字形式，没有时为第一个假名形式）、第一个读音和义项文字。
+    义项第一次被访问时才加载，同一批加载的词条共用一次查询；
+    义项文字与 Jamdict 的 Sense.text() 相同，用 sys.intern 保存（大量词条共用同样的释义）。
+    """
+
+    __slots__ = ('idseq', 'word', 'reading', '_senses', '_loader')
+
+    def __init__(self, idseq, word, reading, loader=None):
+        self.idseq = idseq
+        self.word = word
+        self.reading = reading
+        self._senses = None
+        self._loader = loader
+
+    @property
+    def senses(self):
+        """义项文字的元组，每个义项的各条释义用 / 连接。"""
+        if self._senses is None:
+            loader = self._loader
+            if loader is not None:
+                # 其他线程正在加载同一批时在这里等它完成
+                loader.load()
+            if self._senses is None:
+                return ()
+        return self._senses
+
+    def __repr__(self):
+        return f"EntryView({self.idseq}, {self.word!r}, {self.reading!r})"
+
+
+class _SenseLoader:
+    """
+    一批 EntryView 共用的义项加载器：任何一个词条第一次访问义项时，整批一次查完。
+    词条在进程共享的缓存中，可能被多个线程同时访问：加载时持锁，其他线程等这次加载完成后直接使用结果。
+    """
+
+    __slots__ = ('connect', 'views', 'lock')
+
+    def __init__(self, connect, views):
+        self.connect = connect
+        self.views = views
+        self.lock = threading.Lock()
+
+    def load(self):
+        with self.lock:
+            views = self.views
+            if not views:
+                return
+            senses = {}
+            with self.connect() as conn:
+                for chunk in _chunks([view.idseq for view in views]):
+                    cursor = conn.execute(
+                        "SELECT Sense.idseq, Sense.ID, SenseGloss.lang, SenseGloss.gend, SenseGloss.text "
+                        "FROM Sense LEFT JOIN SenseGloss ON SenseGloss.sid = Sense.ID "
+                        f"WHERE Sense.idseq IN ({','.join('?' * len(chunk))}) ORDER BY Sense.ID, SenseGloss.rowid",
+                        chunk,
+                    )
+                    for idseq, sid, lang, gend, text in cursor:
+                        glosses = senses.setdefault(idseq, {}).setdefault(sid, [])
+                        if text is not None:
+                            glosses.append(sys.intern(gloss_text(lang, gend, text)))
+            for view in views:
+                by_sense = senses.get(view.idseq, {})
+                view._senses = tuple(sys.intern('/'.join(glosses)) for glosses in by_sense.values())
+                view._loader = None
+            # 查询失败时保留 views，下次访问时重新加载
+            self.views = ()
+
+
+def _chunks(idseqs):
+    for i in range(0, len(idseqs), _BATCH):
+        yield idseqs[i:i + _BATCH]
+
+
+def load_views(conn, idseqs, connect):
+    """
+    按 idseq 的顺序构建 EntryView（数据库中没有的 idseq 会被跳过）。
+    词头和读音用 conn 立即查出；义项在第一次访问时通过 connect()（返回连接的上下文管理器）整批加载。
+    """
+    words, readings = {}, {}
+    for chunk in _chunks(list(dict.fromkeys(idseqs))):
+        marks = ','.join('?' * len(chunk))
+        # ORDER BY ID 保持 JMdict 中各形式的先后顺序，每个词条只取第一个
+        for idseq, text in conn.execute(f"SELECT idseq, text FROM Kanji WHERE idseq IN ({marks}) ORDER BY ID", chunk):
+            words.setdefault(idseq, text)
+        for idseq, text in conn.execute(f"SELECT idseq, text FROM Kana WHERE idseq IN ({marks}) ORDER BY ID", chunk):
+            readings.setdefault(idseq, text)
+    views = []
+    loader = _SenseLoader(connect, views)
+    for idseq in idseqs:
+        if idseq in words or idseq in readings:
+            reading = readings.get(idseq, "")
+            views.append(EntryView(idseq, words.get(idseq, reading), reading, loader))
+    return views
@@ -0,0 +1,191 @@
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+SCHEMA_SQL = '''
+    CREATE TABLE IF NOT EXISTS favorites
+    (id INTEGER PRIMARY KEY,
+    word TEXT NOT NULL,
+    reading TEXT,
+    definition TEXT NOT NULL,
+    UNIQUE(word, definition));
+'''
+# 所有语句都是固定的 SQL 文本，sqlite3 会按连接缓存编译好的语句（cached_statements）
+SELECT_SQL = "SELECT word, reading, definition FROM favorites ORDER BY id DESC"
+EXISTS_SQL = "SELECT 1 FROM favorites WHERE word = ? AND definition = ?"
+INSERT_SQL = "INSERT OR IGNORE INTO favorites (word, reading, definition) VALUES (?, ?, ?)"
+DELETE_SQL = "DELETE FROM favorites WHERE word = ? AND definition = ?"
+# 后台写入失败后重试的最长等待时间（秒）
+MAX_RETRY_DELAY = 30.0
+
+logger = logging.getLogger(__name__)
+
+
+class FavoritesStore:
+    """
+    收藏夹存储层：
+    - 固定大小的长连接池，所有连接使用 WAL 日志，读写互不阻塞；
+    - (word, definition) 上有索引，支撑去重和 DELETE ... WHERE word = ? AND definition = ?；
+    - 新增收藏先放进写队列，由后台线程合并成一个事务批量写入。
+    尚未写入的收藏会合并到 list_all() 的结果中，所以界面上看起来是立即生效的。
+    """
+
+    def __init__(self, db_path, pool_size=4, batch_size=50, flush_interval=0.5):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pool = queue.Queue()
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+        self._init_schema()
+
+        # 写队列：(word, reading, definition)；_pending 记录还没写入数据库的收藏
+        self._writes = queue.Queue()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._writer = threading.Thread(target=self._write_loop, name="favorites-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10, cached_statements=64)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_schema(self):
+        with self.connection() as conn:
+            conn.execute(SCHEMA_SQL)
+            # 旧的 favorites.db 可能是没有 UNIQUE 约束时建的，确保 (word, definition) 上有索引
+            if not self._has_word_definition_index(conn):
+                conn.execute("CREATE INDEX IF NOT EXISTS favorites_word_definition ON favorites(word, definition)")
+            conn.commit()
+
+    @staticmethod
+    def _has_word_definition_index(conn):
+        for index in conn.execute("PRAGMA index_list(favorites)").fetchall():
+            columns = [row[2] for row in conn.execute(f"PRAGMA index_info('{index[1]}')")]
+            if columns[:2] == ['word', 'definition']:
+                return True
+        return False
+
+    # --- 连接池 ---
+    def connection(self):
+        return _PooledConnection(self._pool)
+
+    # --- 读 ---
+    def list_all(self):
+        """返回所有收藏 [(word, reading, definition), ...]，最新的在前。"""
+        with self._lock:
+            pending = list(reversed(self._pending.values()))
+        with self.connection() as conn:
+            rows = conn.execute(SELECT_SQL).fetchall()
+        pending_keys = {(word, definition) for word, _, definition in pending}
+        return pending + [row for row in rows if (row[0], row[2]) not in pending_keys]
+
+    def contains(self, word, definition):
+        with self._lock:
+            if (word, definition) in self._pending:
+                return True
+        with self.connection() as conn:
+            return conn.execute(EXISTS_SQL, (word, definition)).fetchone() is not None
+
+    # --- 写 ---
+    def add(self, word, reading, definition):
+        """加入写队列；已经收藏过时返回 False。"""
+        if self.contains(word, definition):
+            return False
+        with self._lock:
+            self._pending[(word, definition)] = (word, reading, definition)
+        self._writes.put((word, reading, definition))
+        return True
+
+    def remove(self, word, definition):
+        with self._lock:
+            self._pending.pop((word, definition), None)
+        with self.connection() as conn:
+            conn.execute(DELETE_SQL, (word, definition))
+            conn.commit()
+
+    def flush(self):
+        """把写队列中剩余的收藏立即写入数据库。"""
+        batch = []
+        while True:
+            try:
+                batch.append(self._writes.get_nowait())
+            except queue.Empty:
+                break
+        self._write_batch(batch)
+
+    def _write_loop(self):
+        failures = 0
+        while True:
+            batch = [self._writes.get()]
+            # 在 flush_interval 内攒够一批再写，减少对数据库文件锁的争用
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._writes.get(timeout=self.flush_interval))
+            except queue.Empty:
+                pass
+            try:
+                self._write_batch(batch)
+                failures = 0
+            except sqlite3.Error:
+                # 数据库被锁、磁盘已满等：这一批仍留在 _pending 中，等一会儿放回写队列重试，写线程不退出
+                failures += 1
+                delay = min(self.flush_interval * 2 ** failures, MAX_RETRY_DELAY)
+                logger.exception("写入 %d 条收藏失败，%.1f 秒后重试", len(batch), delay)
+                time.sleep(delay)
+                for row in batch:
+                    self._writes.put(row)
+
+    def _write_batch(self, batch):
+        if not batch:
+            return
+        # 只在持锁时读写 _pending，数据库写入在锁外进行，add/remove/contains 不必等待磁盘 I/O
+        with self._lock:
+            # 写入前被移除的收藏不再写入；记下写入的是哪一次加入（_pending 中的对象）
+            written = {(row[0], row[2]): self._pending.get((row[0], row[2])) for row in batch}
+            batch = [row for key, row in written.items() if row is not None]
+            if not batch:
+                return
+        with self.connection() as conn:
+            conn.executemany(INSERT_SQL, batch)
+            conn.commit()
+        with self._lock:
+            removed = []
+            for key, row in written.items():
+                if row is None:
+                    continue
+                current = self._pending.get(key)
+                if current is row:
+                    del self._pending[key]
+                elif current is None:
+                    # 写入期间被 remove()：它的 DELETE 可能早于这次 INSERT，需要再删一次
+                    removed.append(key)
+        if removed:
+            with self.connection() as conn:
+                conn.executemany(DELETE_SQL, removed)
+                conn.commit()
+
+
+class _PooledConnection:
+    """with 语句中从连接池借出一个连接，结束后归还（出错时先回滚）。"""
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._conn = None
+
+    def __enter__(self):
+        self._conn = self._pool.get()
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._conn.rollback()
+        self._pool.put(self._conn)
+        self._conn = None
+        return False
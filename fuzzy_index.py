@@ -0,0 +1,158 @@
+import sqlite3
+from itertools import combinations
+
+from kana_utils import to_hiragana
+
+
+def edit_distance(a, b, max_distance):
+    """
+    受限 Damerau-Levenshtein 距离（相邻字符交换算 1 次编辑）。
+    一旦确定距离超过 max_distance 就提前返回 max_distance + 1。
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    # 候选词大多与查询词共享前缀/后缀，先去掉公共部分再做动态规划
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if not a or not b:
+        return max(len(a), len(b))
+    big = max_distance + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [big] * len(b)
+        # 只计算对角线附近 max_distance 宽的带状区域
+        lo = max(1, i - max_distance)
+        hi = min(len(b), i + max_distance)
+        row_min = cur[0] if lo == 1 else big
+        for j in range(lo, hi + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, prev2[j - 2] + 1)
+            cur[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return big
+        prev2, prev = prev, cur
+    return min(prev[-1], big)
+
+
+def _deletes(word, max_distance):
+    """
+    生成 word 删除最多 max_distance 个字符后得到的所有字符串（包括 word 本身），
+    返回 {字符串: 最少删除次数}。
+    """
+    results = {word: 0}
+    for n in range(1, min(max_distance, len(word)) + 1):
+        for positions in combinations(range(len(word)), n):
+            results.setdefault("".join(c for i, c in enumerate(word) if i not in positions), n)
+    return results
+
+
+class SymSpellIndex:
+    """
+    SymSpell 风格的"对称删除"模糊索引，建立在所有 JMdict 假名读音之上。
+    构建时为每个读音预先生成删除 1~max_distance 个字符的邻域，
+    查询时只需对查询词做同样的删除并查表，再用编辑距离验证候选，
+    不需要遍历整个词典。
+    """
+
+    def __init__(self, reading_pairs, max_distance=2, prefix_length=5):
+        # reading_pairs: (假名读音, idseq) 的可迭代对象
+        # prefix_length: 只对读音的前 prefix_length 个字符生成删除邻域（SymSpell 的前缀优化），
+        # 后面的字符在验证阶段用完整的编辑距离检查，这样索引大小不随读音长度增长
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.readings = {}
+        for text, idseq in reading_pairs:
+            self.readings.setdefault(to_hiragana(text), []).append(idseq)
+        self.words = list(self.readings)
+        # deletes[n]: 删除 n 个字符得到的字符串 -> 读音编号列表。
+        # 按删除次数分开存放，查询距离较小时就不必检查删除次数更多的候选
+        self.deletes = [{} for _ in range(max_distance + 1)]
+        for word_id, word in enumerate(self.words):
+            for variant, n in _deletes(word[:prefix_length], max_distance).items():
+                self.deletes[n].setdefault(variant, []).append(word_id)
+
+    @classmethod
+    def from_db(cls, db_path, max_distance=2, prefix_length=5):
+        """读取 Jamdict 生成的 SQLite 数据库中的 Kana 表来构建索引。"""
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        try:
+            pairs = conn.execute("SELECT text, idseq FROM Kana WHERE text != ''").fetchall()
+            return cls(pairs, max_distance=max_distance, prefix_length=prefix_length)
+        finally:
+            conn.close()
+
+    def default_distance(self, query):
+        """
+        查询词很短时允许 2 处编辑会匹配到大量无关的词，
+        所以 2 个假名以下不做模糊匹配，3~4 个假名允许 1 处，5 个以上才允许 max_distance 处。
+        """
+        if len(query) <= 2:
+            return 0
+        if len(query) <= 4:
+            return min(1, self.max_distance)
+        return self.max_distance
+
+    def lookup(self, query, max_distance=None):
+        """
+        返回与 query 编辑距离不超过 max_distance 的读音列表 [(读音, 距离), ...]，
+        按距离从小到大排序，距离相同时长度接近查询词的优先。
+        max_distance 为 None 时按查询词长度自动选择（见 default_distance）。
+        """
+        query = to_hiragana(query)
+        if not query:
+            return []
+        if max_distance is None:
+            max_distance = self.default_distance(query)
+        max_distance = min(max_distance, self.max_distance)
+        seen = set()
+        matches = []
+        query_len = len(query)
+        variants = _deletes(query[:self.prefix_length], max_distance)
+        candidates = (
+            word_id
+            for deletes in self.deletes[:max_distance + 1]
+            for variant in variants
+            for word_id in deletes.get(variant, ())
+        )
+        for word_id in candidates:
+            if word_id in seen:
+                continue
+            seen.add(word_id)
+            word = self.words[word_id]
+            # 长度差已经超过允许的编辑次数，不必计算编辑距离
+            if abs(len(word) - query_len) > max_distance:
+                continue
+            distance = edit_distance(query, word, max_distance)
+            if distance <= max_distance:
+                matches.append((word, distance))
+        matches.sort(key=lambda m: (m[1], abs(len(m[0]) - len(query)), m[0]))
+        return matches
+
+    def lookup_idseqs(self, query, max_distance=None, exclude_exact=True):
+        """把 lookup() 的结果展开成 idseq 列表（按距离排序、去重）。"""
+        return self.expand(query, self.lookup(query, max_distance), exclude_exact)
+
+    def expand(self, query, matches, exclude_exact=True):
+        """把已经查好的 lookup(query) 结果展开成 idseq 列表，同一次查找的结果可以给多个层级共用。"""
+        query_hira = to_hiragana(query)
+        idseqs = []
+        found = set()
+        for word, distance in matches:
+            if exclude_exact and distance == 0 and word == query_hira:
+                continue
+            for idseq in self.readings[word]:
+                if idseq not in found:
+                    found.add(idseq)
+                    idseqs.append(idseq)
+        return idseqs
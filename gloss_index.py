@@ -0,0 +1,168 @@
+import argparse
+import os
+import re
+import sqlite3
+import time
+
+from read_pool import ReadPool
+
+# 一次从全文索引中取出的候选释义数（按 BM25 排好序），再在 Python 中加权重排
+CANDIDATE_LIMIT = 2000
+# 释义是词条第一个义项时的加权
+FIRST_SENSE_BOOST = 1.5
+# 去掉括号说明和 to/a/the 之后与查询完全相同的释义（例如查 eat 时的 "to eat"）
+EXACT_GLOSS_BOOST = 3.0
+# 常用度分数（ranking.COMMONALITY_SCORES 之和）每多这么多，分数多乘 1 倍
+COMMONALITY_SCALE = 40.0
+# 索引格式的版本号（写在 user_version 中），旧版本生成的索引在加载时重新生成
+INDEX_VERSION = 2
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+# 最内层的一对括号；反复替换直到没有括号，嵌套的括号（dog (Canis (lupus) familiaris)）也能整个去掉
+_PAREN_RE = re.compile(r"\s*\([^()]*\)\s*")
+_LEADING_WORDS = ('to ', 'a ', 'an ', 'the ')
+
+
+def gloss_path_for(db_path):
+    """英文释义的全文索引存放在词典数据库旁边，例如 JMdict.db -> JMdict_gloss.db。"""
+    return os.path.splitext(db_path)[0] + '_gloss.db'
+
+
+def normalize_gloss(text):
+    """用于判断“完全相同”的释义形式：小写，去掉括号说明和开头的 to/a/an/the。"""
+    text = text.lower()
+    while True:
+        stripped = _PAREN_RE.sub(' ', text)
+        if stripped == text:
+            break
+        text = stripped
+    text = text.strip()
+    for word in _LEADING_WORDS:
+        if text.startswith(word):
+            return text[len(word):].strip()
+    return text
+
+
+def build_gloss_index(db_path, out_path=None):
+    """
+    为 SenseGloss 表中的每条英文释义建一行 FTS5 全文索引（porter 词干 + unicode61 分词），
+    同时记下它属于哪个词条、是第几个义项。
+    """
+    out_path = out_path or gloss_path_for(db_path)
+    src = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        # 义项在词条内的序号：Sense.ID 按导入顺序递增。先在 Sense 表上编号再连接释义，
+        # 同一义项的所有释义（見る 的 "to look"、"to watch"）序号相同
+        rows = src.execute(
+            "SELECT SenseGloss.text, s.idseq, s.sense_no FROM SenseGloss JOIN "
+            "(SELECT ID, idseq, ROW_NUMBER() OVER (PARTITION BY idseq ORDER BY ID) - 1 AS sense_no FROM Sense) s "
+            "ON SenseGloss.sid = s.ID "
+            "WHERE SenseGloss.lang IS NULL OR SenseGloss.lang = 'eng'"
+        ).fetchall()
+    finally:
+        src.close()
+
+    tmp_path = out_path + '.building'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("CREATE VIRTUAL TABLE gloss USING fts5"
+                     "(text, idseq UNINDEXED, sense_no UNINDEXED, tokenize='porter unicode61 remove_diacritics 2')")
+        conn.executemany("INSERT INTO gloss (text, idseq, sense_no) VALUES (?, ?, ?)", rows)
+        conn.execute("INSERT INTO gloss (gloss) VALUES ('optimize')")
+        conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def index_version(path):
+    """已生成的全文索引的格式版本号。"""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def fts_query(query, operator=' '):
+    """把用户输入转成 FTS5 查询：每个词加引号，避免 AND/OR/NEAR、* 和引号被当成查询语法。"""
+    words = _WORD_RE.findall(query.lower())
+    return operator.join(f'"{word}"' for word in words)
+
+
+class GlossIndex:
+    """
+    英文释义搜索：FTS5 先按 BM25 取出候选释义，再乘上首义项和常用度的加权、
+    对与查询完全相同的释义再加权，每个词条取它最好的一条释义的分数，按分数从高到低返回 idseq。
+    索引是只读的，查询时从只读连接池中借用连接（见 read_pool.py）。
+    """
+
+    def __init__(self, path, features):
+        self.path = path
+        self.features = features
+        self._pool = ReadPool(path)
+
+    @classmethod
+    def load(cls, db_path, features):
+        """打开 db_path 对应的全文索引；还没有生成过或格式版本过旧时先生成一次。"""
+        path = gloss_path_for(db_path)
+        if not os.path.exists(path) or index_version(path) != INDEX_VERSION:
+            build_gloss_index(db_path, path)
+        return cls(path, features)
+
+    def has_term(self, query):
+        """索引中是否有释义包含 query 的所有词（用于判断一串字母是英文还是罗马音）。"""
+        match = fts_query(query)
+        if not match:
+            return False
+        with self._pool.connection() as conn:
+            return conn.execute("SELECT 1 FROM gloss WHERE gloss MATCH ? LIMIT 1", (match,)).fetchone() is not None
+
+    def _candidates(self, match):
+        with self._pool.connection() as conn:
+            return conn.execute(
+                "SELECT idseq, sense_no, text, bm25(gloss) FROM gloss WHERE gloss MATCH ? ORDER BY rank LIMIT ?",
+                (match, CANDIDATE_LIMIT),
+            ).fetchall()
+
+    def search(self, query, limit=None):
+        """返回按相关度排好序的 idseq 列表；所有词都出现的释义优先，没有时退回到出现任一个词。"""
+        rows = self._candidates(fts_query(query))
+        if not rows and len(_WORD_RE.findall(query.lower())) > 1:
+            rows = self._candidates(fts_query(query, ' OR '))
+        target = normalize_gloss(query)
+        features = self.features
+        scores = {}
+        for idseq, sense_no, text, bm25 in rows:
+            # FTS5 的 bm25() 越小越相关，取负数后越大越好
+            score = -bm25
+            if sense_no == 0:
+                score *= FIRST_SENSE_BOOST
+            if normalize_gloss(text) == target:
+                score *= EXACT_GLOSS_BOOST
+            i = features.position.get(idseq)
+            if i is not None:
+                score *= 1 + features.commonality[i] / COMMONALITY_SCALE
+            if score > scores.get(idseq, float('-inf')):
+                scores[idseq] = score
+        ranked = sorted(scores, key=lambda idseq: (-scores[idseq], idseq))
+        return ranked if limit is None else ranked[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成英文释义的全文索引")
+    parser.add_argument('db', help="Jamdict 词典数据库路径，例如 JMdict.db")
+    parser.add_argument('--out', help="输出路径，默认与数据库同目录的 *_gloss.db")
+    args = parser.parse_args()
+
+    start = time.time()
+    out_path = build_gloss_index(args.db, args.out)
+    print(f"释义索引已写入 {out_path}，用时 {time.time() - start:.1f} 秒")
+
+
+if __name__ == "__main__":
+    main()
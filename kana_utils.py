@@ -0,0 +1,66 @@
+import re
+
+# 片假名与平假名的码位差
+_KATA_HIRA_OFFSET = ord('ア') - ord('あ')
+
+# 小写假名 -> 普通假名
+SMALL_KANA = str.maketrans('ぁぃぅぇぉゃゅょゎゕゖ', 'あいうえおやゆよわかけ')
+
+# 每个平假名所属的元音行，用于合并长音
+_VOWEL_ROWS = {
+    'a': 'あかさたなはまやらわがざだばぱ',
+    'i': 'いきしちにひみりぎじぢびぴ',
+    'u': 'うくすつぬふむゆるぐずづぶぷゔ',
+    'e': 'えけせてねへめれげぜでべぺ',
+    'o': 'おこそとのほもよろをごぞどぼぽ',
+}
+KANA_VOWEL = {kana: vowel for vowel, row in _VOWEL_ROWS.items() for kana in row}
+VOWEL_KANA = {'a': 'あ', 'i': 'い', 'u': 'う', 'e': 'え', 'o': 'お'}
+
+
+def is_romaji(text):
+    """只由罗马音字母组成；紧跟在 n 后面的 ' 是 ん 的分隔符（kon'ya -> こんや），也算罗马音。"""
+    return bool(re.match(r"^(?:[a-zA-Zōūāīē]|(?<=[nN])')+$", text))
+
+
+def only_kanji(query):
+    """去掉 query 中的所有非汉字字符。"""
+    return "".join(re.findall(r'[\u4e00-\u9faf]', query))
+
+
+def is_kana(text):
+    """判断字符串是否只由平假名、片假名和长音符组成。"""
+    return bool(text) and all('ぁ' <= c <= 'ゖ' or 'ァ' <= c <= 'ヺ' or c == 'ー' for c in text)
+
+
+def to_hiragana(text):
+    """把片假名统一为平假名，其他字符保持不变。"""
+    return "".join(
+        chr(ord(c) - _KATA_HIRA_OFFSET) if 'ァ' <= c <= 'ヶ' else c
+        for c in text
+    )
+
+
+def fold_reading(text):
+    """
+    生成用于容错搜索的"折叠读音"：
+    1. 片假名统一为平假名，小写假名变为普通假名；
+    2. 去掉促音 `っ` 和长音符 `ー`；
+    3. 合并长音：前一个假名的元音后面跟着同元音、おう、えい 时只保留一个。
+    例如 がっこう、がこう、ガッコー 都折叠为 がこ。
+    """
+    folded = []
+    prev_vowel = None
+    for c in to_hiragana(text):
+        if c in ('っ', 'ー'):
+            continue
+        c = c.translate(SMALL_KANA)
+        if prev_vowel and (
+            c == VOWEL_KANA[prev_vowel]
+            or (prev_vowel == 'o' and c == 'う')
+            or (prev_vowel == 'e' and c == 'い')
+        ):
+            continue
+        folded.append(c)
+        prev_vowel = KANA_VOWEL.get(c)
+    return "".join(folded)
@@ -0,0 +1,213 @@
+import bisect
+import re
+import sqlite3
+from array import array
+from contextlib import contextmanager
+
+from entry_view import load_views
+from kana_utils import fold_reading
+from tracing import span, watch_sql
+
+# 比任何假名/汉字都大的字符，用于计算前缀搜索的上界
+_PREFIX_END = '\U0010ffff'
+# 容错前缀匹配时折叠读音至少要有的假名数
+MIN_FOLDED_PREFIX = 2
+# 建立倒排表的汉字范围：CJK 统一汉字、扩展 A 和兼容汉字（常用汉字都在其中）
+_KANJI_RE = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]')
+
+
+def kanji_chars(text):
+    """text 中出现的汉字，去重并保持出现顺序。"""
+    return list(dict.fromkeys(_KANJI_RE.findall(text)))
+
+
+class SortedKeyIndex:
+    """排好序的 (key, idseq) 数组，支持二分查找的精确匹配和前缀匹配。"""
+
+    def __init__(self, pairs):
+        # pairs: (key, idseq) 的可迭代对象
+        pairs = sorted(set(pairs))
+        self.keys = [key for key, _ in pairs]
+        self.idseqs = [idseq for _, idseq in pairs]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _range(self, lo_key, hi_key):
+        lo = bisect.bisect_left(self.keys, lo_key)
+        hi = bisect.bisect_right(self.keys, hi_key, lo)
+        return lo, hi
+
+    def _collect(self, lo, hi):
+        # 同一个词条可能有多个形式同时命中，去重后按 idseq 升序返回（与 jmd.lookup 的顺序一致）
+        return sorted(set(self.idseqs[lo:hi]))
+
+    def exact(self, key):
+        if not key:
+            return []
+        return self._collect(*self._range(key, key))
+
+    def prefix(self, key):
+        if not key:
+            return []
+        return self._collect(*self._range(key, key + _PREFIX_END))
+
+
+class KanjiPostings:
+    """
+    汉字 -> 含有该汉字的词条 idseq 的倒排表（升序 array）。
+    “包含所有这些汉字”的查询是几个倒排表求交集：从最短的表出发，在其余的表中二分查找。
+    """
+
+    def __init__(self, kanji_pairs):
+        postings = {}
+        for text, idseq in kanji_pairs:
+            for c in kanji_chars(text):
+                postings.setdefault(c, set()).add(idseq)
+        self.postings = {c: array('l', sorted(ids)) for c, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.postings)
+
+    def get(self, kanji):
+        return self.postings.get(kanji, array('l'))
+
+    def contains_all(self, chars):
+        """汉字形式中含有 chars 中每一个汉字的词条（idseq 升序）。"""
+        lists = sorted((self.get(c) for c in set(chars)), key=len)
+        if not lists:
+            return []
+        result = list(lists[0])
+        for other in lists[1:]:
+            if not result:
+                break
+            n = len(other)
+            kept = []
+            lo = 0
+            for idseq in result:
+                lo = bisect.bisect_left(other, idseq, lo)
+                if lo == n:
+                    break
+                if other[lo] == idseq:
+                    kept.append(idseq)
+            result = kept
+        return result
+
+
+class NgramIndex:
+    """
+    所有汉字/假名形式的二元组（相邻两个字符）倒排表，用于任意位置的子串匹配（例如 がっこう 中的 っこう）。
+    查找时取查询中最少见的几个二元组的倒排表求交集得到候选形式，再逐个确认确实包含整个查询，
+    因此耗时只与候选数有关，不需要 LIKE '%x%' 那样扫描整张表。
+    """
+
+    # 参与求交集的二元组个数：更多的二元组几乎不再减少候选，只增加开销
+    MAX_GRAMS = 3
+
+    def __init__(self, pairs):
+        pairs = sorted(set(pairs))
+        self.texts = [text for text, _ in pairs]
+        self.idseqs = array('l', (idseq for _, idseq in pairs))
+        postings = {}
+        for i, text in enumerate(self.texts):
+            for gram in {text[j:j + 2] for j in range(len(text) - 1)}:
+                postings.setdefault(gram, []).append(i)
+        self.postings = {gram: array('l', rows) for gram, rows in postings.items()}
+
+    def __len__(self):
+        return len(self.postings)
+
+    def includes(self, text):
+        """形式中任意位置含有 text 的词条（idseq 升序）；text 至少要有两个字符。"""
+        grams = {text[j:j + 2] for j in range(len(text) - 1)}
+        if not grams:
+            return []
+        lists = sorted((self.postings.get(gram, array('l')) for gram in grams), key=len)[:self.MAX_GRAMS]
+        rows = set(lists[0])
+        for other in lists[1:]:
+            rows.intersection_update(other)
+        texts = self.texts
+        return sorted({self.idseqs[row] for row in rows if text in texts[row]})
+
+
+class HeadwordIndex:
+    """
+    从 JMdict.db 一次性构建的内存索引：
+    - forms: 所有汉字形式和假名形式 -> idseq，用于层级 1/2；
+    - folded: 所有假名形式的折叠读音（见 kana_utils.fold_reading）-> idseq，用于容错匹配；
+    - kanji: 每个汉字 -> 汉字形式中含有它的 idseq 倒排表，用于包含匹配；
+    - ngrams: 所有形式的二元组倒排表，用于任意位置的子串匹配。
+    查找只返回 idseq 列表，完整的 Entry 对象只在需要显示时才通过 hydrate() 加载。
+    """
+
+    def __init__(self, kanji_pairs, kana_pairs):
+        kanji_pairs = list(kanji_pairs)
+        kana_pairs = list(kana_pairs)
+        self.forms = SortedKeyIndex(kanji_pairs + kana_pairs)
+        self.kanji = KanjiPostings(kanji_pairs)
+        self.ngrams = NgramIndex(kanji_pairs + kana_pairs)
+        self.folded = SortedKeyIndex((fold_reading(text), idseq) for text, idseq in kana_pairs)
+
+    @classmethod
+    def from_db(cls, db_path):
+        """读取 Jamdict 生成的 SQLite 数据库中的 Kanji 表和 Kana 表来构建索引。"""
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        try:
+            kanji_pairs = conn.execute("SELECT text, idseq FROM Kanji WHERE text != ''").fetchall()
+            kana_pairs = conn.execute("SELECT text, idseq FROM Kana WHERE text != ''").fetchall()
+            return cls(kanji_pairs, kana_pairs)
+        finally:
+            conn.close()
+
+    def __len__(self):
+        return len(self.forms)
+
+    def exact(self, text):
+        """完全匹配：返回所有汉字/假名形式等于 text 的 idseq 列表。"""
+        return self.forms.exact(text)
+
+    def prefix(self, text):
+        """前缀匹配：相当于 jmd.lookup(f"{text}%")，但只查汉字/假名形式。"""
+        return self.forms.prefix(text)
+
+    def folded_exact(self, text):
+        """容错完全匹配：折叠读音相同的所有词条（促音、长音、大小写假名、平片假名都不区分）。"""
+        return self.folded.exact(fold_reading(text))
+
+    def folded_prefix(self, text):
+        """
+        容错前缀匹配：一次查找覆盖所有促音/长音变体。
+        折叠会去掉促音和长音，折叠后的读音太短（不到 MIN_FOLDED_PREFIX 个假名，或不到原查询的一半，
+        例如 っこう -> こ）时前缀会宽到全是无关词条，这时只做折叠读音的完全匹配。
+        """
+        key = fold_reading(text)
+        if len(key) < MIN_FOLDED_PREFIX or len(key) * 2 < len(text):
+            return self.folded.exact(key)
+        return self.folded.prefix(key)
+
+    def contains(self, text):
+        """包含匹配：汉字形式中含有 text 里所有汉字的词条，相当于对每个汉字 LIKE '%x%' 再取交集。"""
+        return self.kanji.contains_all(kanji_chars(text))
+
+    def includes(self, text):
+        """子串匹配：任意汉字/假名形式中含有 text 的词条，相当于 LIKE '%text%'。"""
+        return self.ngrams.includes(text)
+
+    def hydrate(self, db, idseqs):
+        """
+        按 idseq 加载显示用的 EntryView：词头和读音整批两次查询，
+        义项等到第一次显示时再整批加载（不再构建完整的 Jamdict Entry 对象）。
+        db 是词典数据库的只读连接池（read_pool.ReadPool）。
+        """
+        if not idseqs:
+            return []
+
+        @contextmanager
+        def senses_connection():
+            with span('hydrate.senses'), db.connection() as conn:
+                yield watch_sql(conn)
+
+        with span('hydrate') as s, db.connection() as conn:
+            watch_sql(conn)
+            s.count = len(idseqs)
+            return load_views(conn, idseqs, senses_connection)
@@ -0,0 +1,172 @@
+import argparse
+import os
+import sqlite3
+import time
+from array import array
+
+COMMONALITY_SCORES = {
+    'ichi1': 25, 'ichi2': 15, 'news1': 20, 'news2': 10,
+    'gai1': 18, 'gai2': 8, 'spec1': 12, 'spec2': 5,
+}
+POS_SCORES = {'v': 10, 'adj': 8, 'adv': 6, 'n': 5}
+
+# 优先级标记在 flags 中对应的位
+PRIORITY_FLAGS = {tag: 1 << i for i, tag in enumerate(COMMONALITY_SCORES)}
+
+# Jamdict 数据库中的词性是展开后的说明文字（例如 "Ichidan verb"），
+# 按关键词在说明中最早出现的位置判断大类
+_POS_KEYWORDS = (('adverb', 'adv'), ('adjectiv', 'adj'), ('verb', 'v'), ('noun', 'n'))
+
+
+def pos_class(pos):
+    """把 JMdict 词性（代码如 v1、adj-i，或说明文字如 Ichidan verb）归到 POS_SCORES 的大类。"""
+    if ' ' not in pos and pos.isascii():
+        # 词性代码
+        for prefix in ('adv', 'adj', 'v'):
+            if pos.startswith(prefix):
+                return prefix
+        return 'n' if pos == 'n' or pos.startswith('n-') else None
+    text = pos.lower()
+    found = [(text.find(keyword), cls) for keyword, cls in _POS_KEYWORDS if keyword in text]
+    return min(found)[1] if found else None
+
+
+def get_pos_score(pos):
+    cls = pos_class(pos)
+    return POS_SCORES.get(cls, 1)
+
+
+def features_path_for(db_path):
+    """排序特征表存放在词典数据库旁边，例如 JMdict.db -> JMdict_features.db。"""
+    return os.path.splitext(db_path)[0] + '_features.db'
+
+
+def compute_features(db_path):
+    """
+    离线计算每个词条的排序特征：
+    (idseq, 常用度分数, 最佳词性分数, 首个词头长度, 优先级标记位)。
+    直接在 SQL 上按表汇总，不需要构建 Entry 对象。
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        priorities = {}
+        cursor = conn.execute(
+            "SELECT Kanji.idseq, KJP.text FROM KJP JOIN Kanji ON KJP.kid = Kanji.ID "
+            "UNION SELECT Kana.idseq, KNP.text FROM KNP JOIN Kana ON KNP.kid = Kana.ID"
+        )
+        for idseq, pri in cursor:
+            priorities.setdefault(idseq, set()).add(pri)
+
+        pos_scores = {}
+        pos_cache = {}
+        for idseq, pos in conn.execute("SELECT Sense.idseq, pos.text FROM pos JOIN Sense ON pos.sid = Sense.ID"):
+            if pos not in pos_cache:
+                pos_cache[pos] = get_pos_score(pos)
+            if pos_cache[pos] > pos_scores.get(idseq, 0):
+                pos_scores[idseq] = pos_cache[pos]
+
+        # 与显示逻辑一致：有汉字形式时取第一个汉字形式，否则取第一个假名形式
+        headwords = {}
+        for idseq, text in conn.execute("SELECT idseq, text FROM Kana ORDER BY ID DESC"):
+            headwords[idseq] = text
+        for idseq, text in conn.execute("SELECT idseq, text FROM Kanji ORDER BY ID DESC"):
+            headwords[idseq] = text
+
+        rows = []
+        for (idseq,) in conn.execute("SELECT idseq FROM Entry ORDER BY idseq"):
+            pris = priorities.get(idseq, ())
+            rows.append((
+                idseq,
+                sum(COMMONALITY_SCORES.get(p, 0) for p in pris),
+                pos_scores.get(idseq, 0),
+                len(headwords.get(idseq, "")),
+                sum(PRIORITY_FLAGS.get(p, 0) for p in pris),
+            ))
+        return rows
+    finally:
+        conn.close()
+
+
+def build_feature_table(db_path, out_path=None):
+    """运行离线计算并把结果写入特征表数据库。"""
+    out_path = out_path or features_path_for(db_path)
+    rows = compute_features(db_path)
+    conn = sqlite3.connect(out_path)
+    try:
+        conn.execute("DROP TABLE IF EXISTS features")
+        conn.execute('''CREATE TABLE features
+                        (idseq INTEGER PRIMARY KEY, commonality INTEGER, pos_score INTEGER,
+                         headword_len INTEGER, flags INTEGER)''')
+        conn.executemany("INSERT INTO features VALUES (?, ?, ?, ?, ?)", rows)
+        conn.commit()
+    finally:
+        conn.close()
+    return out_path
+
+
+class RankFeatures:
+    """
+    启动时加载的紧凑排序特征表：每个特征一个 array，按 idseq 查位置。
+    排序时只做数组查找，不再遍历 Entry 的汉字形式、假名形式和义项。
+    """
+
+    def __init__(self, rows):
+        self.position = {}
+        self.commonality = array('h')
+        self.pos_score = array('b')
+        self.headword_len = array('h')
+        self.flags = array('h')
+        for i, (idseq, commonality, pos_score, headword_len, flags) in enumerate(rows):
+            self.position[idseq] = i
+            self.commonality.append(commonality)
+            self.pos_score.append(pos_score)
+            self.headword_len.append(headword_len)
+            self.flags.append(flags)
+
+    @classmethod
+    def load(cls, db_path):
+        """读取 db_path 对应的特征表；还没有生成过时先离线计算一次并保存。"""
+        path = features_path_for(db_path)
+        if not os.path.exists(path):
+            build_feature_table(db_path, path)
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            return cls(conn.execute(
+                "SELECT idseq, commonality, pos_score, headword_len, flags FROM features ORDER BY idseq"
+            ))
+        finally:
+            conn.close()
+
+    def sort_key(self, idseq, query_len):
+        """
+        search_idea.md 中的排序规则（同一层级内）：
+        常用度高的优先 -> 比查询词多出的字符少的优先 -> 词性（动词 > 形容词 > 副词 > 名词）。
+        """
+        i = self.position.get(idseq)
+        if i is None:
+            return (0, 0, 0, idseq)
+        return (
+            -self.commonality[i],
+            abs(self.headword_len[i] - query_len),
+            -self.pos_score[i],
+            idseq,
+        )
+
+    def rank(self, idseqs, query):
+        query_len = len(query)
+        return sorted(idseqs, key=lambda idseq: self.sort_key(idseq, query_len))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线计算排序特征表")
+    parser.add_argument('db', help="Jamdict 词典数据库路径，例如 JMdict.db")
+    parser.add_argument('--out', help="输出路径，默认与数据库同目录的 *_features.db")
+    args = parser.parse_args()
+
+    start = time.time()
+    out_path = build_feature_table(args.db, args.out)
+    print(f"特征表已写入 {out_path}，用时 {time.time() - start:.1f} 秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import os
+import queue
+import sqlite3
+from contextlib import contextmanager
+
+
+def read_only_uri(path):
+    """
+    以只读、不可变方式打开 SQLite 文件的 URI。词典和各索引文件只会被整体替换（os.replace），
+    从不原地修改，所以可以用 immutable=1：查询时不加文件锁，也不检查其他连接的改动。
+    """
+    return f"file:{path}?mode=ro&immutable=1"
+
+
+class ReadPool:
+    """
+    只读数据库的连接池，整个进程共用：
+    - 每个线程查询时借出一个连接，用完归还，同一时刻一个连接只被一个线程使用；
+    - 连接在第一次需要时才打开，空闲连接一直保留，页面重跑、HTTP 请求都不再重新打开数据库；
+    - fork 出的子进程（bulk_lookup.py）不沿用父进程的连接，第一次借用时丢弃并重新打开。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+
+    def _open(self):
+        return sqlite3.connect(read_only_uri(self.path), uri=True, check_same_thread=False, cached_statements=64)
+
+    @contextmanager
+    def connection(self):
+        """with 语句中借出一个连接，结束后归还。"""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle = queue.LifoQueue()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._open()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        """关闭所有空闲连接（借出中的连接归还后仍可继续使用）。"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
@@ -0,0 +1,133 @@
+import threading
+from array import array
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    进程内共享的分层搜索结果缓存，键是预处理后的查询（以及释义检索和中文词义匹配用的查询）：
+    - 值只保存各层级的 idseq（array，每个 8 字节），不保存 Entry 对象；
+    - 同时限制条目数和 idseq 总数，超出时按 LRU 淘汰最久没用过的查询；
+    - 记录命中/未命中/淘汰次数，供调试面板显示。
+    缓存属于 SearchEngine；app.py 以 dictionary_stamp 为键缓存引擎，词典重建后会构建新的引擎，旧的缓存随之失效。
+    """
+
+    FIELDS = ('tier1', 'chinese', 'deinflect', 'suggestions', 'tier2', 'contains', 'gloss', 'tier3', 'includes')
+
+    def __init__(self, max_entries=2048, max_ids=1_000_000):
+        self.max_entries = max_entries
+        self.max_ids = max_ids
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_ids = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _size(value):
+        return sum(len(ids) for ids in value)
+
+    def get(self, key):
+        """命中时返回 {层级名: idseq 列表}，否则返回 None。"""
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+        return {field: list(ids) for field, ids in zip(self.FIELDS, value)}
+
+    def put(self, key, result):
+        """缓存一个 SearchResult 的各层级 idseq 列表。"""
+        value = tuple(array('l', getattr(result, field)) for field in self.FIELDS)
+        size = self._size(value)
+        if size > self.max_ids:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.total_ids -= self._size(old)
+            self._data[key] = value
+            self.total_ids += size
+            while len(self._data) > self.max_entries or self.total_ids > self.max_ids:
+                _, evicted = self._data.popitem(last=False)
+                self.total_ids -= self._size(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.total_ids = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'ids': self.total_ids,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+class EntryCache:
+    """
+    进程内共享的词条缓存：idseq -> EntryView，所有会话共用，超过 max_entries 时按 LRU 淘汰。
+    会话状态中只保存 idseq，每次重跑页面时从这里取词条，不再为每个会话各保存一份词条对象。
+    """
+
+    def __init__(self, max_entries=20000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_many(self, idseqs):
+        """返回 {idseq: EntryView}，只包含已缓存的词条。"""
+        found = {}
+        with self._lock:
+            for idseq in idseqs:
+                view = self._data.get(idseq)
+                if view is None:
+                    self.misses += 1
+                    continue
+                self._data.move_to_end(idseq)
+                found[idseq] = view
+                self.hits += 1
+        return found
+
+    def put_many(self, views):
+        with self._lock:
+            for view in views:
+                self._data[view.idseq] = view
+                self._data.move_to_end(view.idseq)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
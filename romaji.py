@@ -0,0 +1,146 @@
+VOWELS = 'aiueo'
+
+# 长音符号：tōkyō -> とうきょう，onēsan -> おねえさん
+MACRONS = str.maketrans({'ā': 'aa', 'ī': 'ii', 'ū': 'uu', 'ē': 'ee', 'ō': 'ou'})
+
+# 辅音 + a/i/u/e/o 的基本行（包括训令式和输入法常用的写法）
+_ROWS = {
+    '': 'あいうえお',
+    'k': 'かきくけこ', 'g': 'がぎぐげご',
+    's': 'さしすせそ', 'z': 'ざじずぜぞ',
+    't': 'たちつてと', 'd': 'だぢづでど',
+    'n': 'なにぬねの',
+    'h': 'はひふへほ', 'b': 'ばびぶべぼ', 'p': 'ぱぴぷぺぽ',
+    'm': 'まみむめも',
+    'r': 'らりるれろ',
+    'x': 'ぁぃぅぇぉ', 'l': 'ぁぃぅぇぉ',
+}
+# 每个音节由几个假名组成时用元组给出（外来语音等）
+_COMPOUND_ROWS = {
+    'y': ('や', 'い', 'ゆ', 'いぇ', 'よ'),
+    'w': ('わ', 'うぃ', 'う', 'うぇ', 'を'),
+    'f': ('ふぁ', 'ふぃ', 'ふ', 'ふぇ', 'ふぉ'),
+    'v': ('ゔぁ', 'ゔぃ', 'ゔ', 'ゔぇ', 'ゔぉ'),
+    'j': ('じゃ', 'じ', 'じゅ', 'じぇ', 'じょ'),
+    'c': ('か', 'し', 'く', 'せ', 'こ'),
+    'q': ('くぁ', 'くぃ', 'く', 'くぇ', 'くぉ'),
+    'ts': ('つぁ', 'つぃ', 'つ', 'つぇ', 'つぉ'),
+    'sh': ('しゃ', 'し', 'しゅ', 'しぇ', 'しょ'),
+    'ch': ('ちゃ', 'ち', 'ちゅ', 'ちぇ', 'ちょ'),
+    'th': ('てゃ', 'てぃ', 'てゅ', 'てぇ', 'てょ'),
+    'dh': ('でゃ', 'でぃ', 'でゅ', 'でぇ', 'でょ'),
+}
+# 拗音：辅音 + y + 元音 -> い段假名 + 小写 ゃぃゅぇょ
+_YOON = {
+    'ky': 'き', 'gy': 'ぎ', 'sy': 'し', 'zy': 'じ', 'jy': 'じ', 'ty': 'ち', 'cy': 'ち', 'dy': 'ぢ',
+    'ny': 'に', 'hy': 'ひ', 'by': 'び', 'py': 'ぴ', 'my': 'み', 'ry': 'り', 'fy': 'ふ', 'vy': 'ゔ',
+    'xy': '', 'ly': '',
+}
+_SMALL_Y = ('ゃ', 'ぃ', 'ゅ', 'ぇ', 'ょ')
+_SPECIAL = {
+    'nn': 'ん', "n'": 'ん',
+    'xtu': 'っ', 'ltu': 'っ', 'xtsu': 'っ', 'ltsu': 'っ',
+    'xwa': 'ゎ', 'lwa': 'ゎ', 'xka': 'ゕ', 'xke': 'ゖ',
+    '-': 'ー',
+}
+
+
+def _build_table():
+    table = {}
+    for consonant, row in _ROWS.items():
+        for vowel, kana in zip(VOWELS, row):
+            table[consonant + vowel] = kana
+    for consonant, row in _COMPOUND_ROWS.items():
+        for vowel, kana in zip(VOWELS, row):
+            table[consonant + vowel] = kana
+    for consonant, kana in _YOON.items():
+        for vowel, small in zip(VOWELS, _SMALL_Y):
+            table[consonant + vowel] = kana + small
+    table.update(_SPECIAL)
+    return table
+
+
+ROMAJI_TABLE = _build_table()
+
+
+def _build_dfa(table):
+    """
+    把罗马音表编译成确定有限自动机：每个状态是 {字符: 下一个状态}，
+    状态 0 为起点；accept[状态] 是走到这里时可以输出的假名（没有则为 None）。
+    """
+    transitions = [{}]
+    accept = [None]
+    for romaji, kana in table.items():
+        state = 0
+        for c in romaji:
+            if c not in transitions[state]:
+                transitions.append({})
+                accept.append(None)
+                transitions[state][c] = len(transitions) - 1
+            state = transitions[state][c]
+        accept[state] = kana
+    return transitions, accept
+
+
+_TRANSITIONS, _ACCEPT = _build_dfa(ROMAJI_TABLE)
+# 表中最长的罗马音决定了最长匹配时最多向前看几个字符，因此整体是线性时间
+MAX_ROMAJI_LEN = max(len(romaji) for romaji in ROMAJI_TABLE)
+
+# 双写辅音表示促音：gakkou -> がっこう，matcha -> まっちゃ（tch）
+_SOKUON_CONSONANTS = set('kgsztdhbpmrfvjcwy')
+
+
+def romaji_to_kana(text):
+    """
+    把罗马音（赫本式、训令式、输入法写法，允许长音符号）转成平假名。
+    返回 (假名, 未完成的输入)：输入还没打完时，结尾凑不成音节的辅音不会被丢掉，
+    而是原样放在第二个返回值里，例如 tabe -> ('たべ', '')，gakk -> ('がっ', 'k')，
+    ky -> ('', 'ky')。结尾单独的 n 也留在未完成的输入里（可能是 な 行的开头）。
+    """
+    s = text.lower().translate(MACRONS)
+    n = len(s)
+    out = []
+    i = 0
+    while i < n:
+        c = s[i]
+        nxt = s[i + 1] if i + 1 < n else ''
+        # m 在 b/m/p 前读作 ん（赫本式：shimbun -> しんぶん）
+        if c == 'm' and nxt and nxt in 'bmp':
+            out.append('ん')
+            i += 1
+            continue
+        # nn 后面还有元音或 y 时只吃掉一个 n：konnichiwa -> こんにちわ
+        if c == 'n' and nxt == 'n' and i + 2 < n and s[i + 2] in VOWELS + 'y':
+            out.append('ん')
+            i += 1
+            continue
+        if c in _SOKUON_CONSONANTS and (nxt == c or (c == 't' and nxt == 'c')):
+            out.append('っ')
+            i += 1
+            continue
+
+        # 在自动机上做最长匹配
+        state, j, match = 0, i, None
+        while j < n and j - i < MAX_ROMAJI_LEN:
+            state = _TRANSITIONS[state].get(s[j])
+            if state is None:
+                break
+            j += 1
+            if _ACCEPT[state] is not None:
+                match = (j, _ACCEPT[state])
+        if match:
+            out.append(match[1])
+            i = match[0]
+        elif state is not None and j == n:
+            # 输入在一个合法前缀的中途结束：还在打字
+            return "".join(out), s[i:]
+        elif c == 'n':
+            # n 后面跟着辅音：ん
+            out.append('ん')
+            i += 1
+        else:
+            # 无法转换的字符原样保留
+            out.append(c)
+            i += 1
+    return "".join(out), ""
+
@@ -0,0 +1,656 @@
+import argparse
+import json
+import os
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from autocomplete import CompletionIndex
+from cedict_index import CedictIndex
+from deinflect import Deinflector
+from fuzzy_index import SymSpellIndex
+from gloss_index import GlossIndex
+from kana_utils import fold_reading, is_kana, is_romaji, only_kanji
+from lookup_index import HeadwordIndex, kanji_chars
+from ranking import RankFeatures
+from read_pool import ReadPool
+from result_cache import EntryCache, ResultCache
+from tracing import Trace, TraceRecorder, activate, span
+from romaji import romaji_to_kana
+from segmenter import Segmenter, is_sentence
+from zh_convert import load_translation_table, replace_zh_to_jp
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+JMD_DB_PATH = os.path.join(APP_DIR, 'JMdict.db')
+
+SUGGESTION_LIMIT = 5
+# 建议词的模糊匹配最多允许的编辑次数（层级 3 按查询长度最多允许 2 处）
+SUGGESTION_MAX_DISTANCE = 1
+# 每个层级一次最多加载并显示的词条数，更多结果通过 offset 分页加载
+RESULT_LIMIT = 30
+# 每次输入补全返回的候选数
+COMPLETION_LIMIT = 10
+
+# 保存词条列表的层级（建议词不算在找到的结果里）
+TIERS = ('tier1', 'chinese', 'deinflect', 'tier2', 'contains', 'gloss', 'tier3', 'includes')
+
+# 按英文处理的输入：只有 ASCII 字母、数字、空格、撇号和连字符
+_ENGLISH_RE = re.compile(r"^[A-Za-z][A-Za-z0-9 '\-]*$")
+
+
+def is_valid_query(query):
+    """为提高效率，单个非汉字字符（一个假名/字母）不启动搜索。"""
+    return bool(query) and not (len(query) == 1 and not re.match(r'[\u4e00-\u9faf]', query))
+
+
+def dictionary_stamp(db_path=JMD_DB_PATH):
+    """词典数据库文件的 (修改时间, 大小)，重建词典后会改变；文件不存在时返回 None。"""
+    if not os.path.exists(db_path):
+        return None
+    stat = os.stat(db_path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def entry_to_dict(entry):
+    """把 EntryView 转成字典（用于 JSON 输出）。"""
+    return {
+        'idseq': entry.idseq,
+        'word': entry.word,
+        'reading': entry.reading,
+        'senses': list(entry.senses),
+    }
+
+
+def tokens_to_dicts(tokens, engine=None):
+    """分词结果转成字典列表；传入 engine 时附带每个片段排名第一的词条内容（一次批量加载）。"""
+    rows = [{
+        'surface': token.surface,
+        'start': token.start,
+        'base': token.base,
+        'reasons': list(token.reasons),
+        'idseqs': token.idseqs[:SUGGESTION_LIMIT],
+    } for token in tokens]
+    if engine is not None:
+        entries = iter(engine.hydrate([token.idseqs[0] for token in tokens if token.idseqs]))
+        for row, token in zip(rows, tokens):
+            row['entry'] = entry_to_dict(next(entries)) if token.idseqs else None
+    return rows
+
+
+class SearchResult:
+    """
+    一次分层搜索的结果：各层级保存排好序的完整 idseq 列表（总数即列表长度），
+    需要显示时只用 SearchEngine.page 加载其中一页的词条。
+    """
+
+    def __init__(self, query):
+        self.query = query
+        self.processed_query = ""
+        self.tier1 = []
+        # 通过 CC-CEDICT 链接表找到的中文词对应词条
+        self.chinese = []
+        # 活用形还原出的辞书形词条
+        self.deinflect = []
+        self.suggestions = []
+        self.tier2 = []
+        # 汉字形式中含有查询里所有汉字的词条
+        self.contains = []
+        self.tier3 = []
+        # 形式中任意位置含有查询的词条（层级 3 的一部分）
+        self.includes = []
+        # 英文释义全文检索的结果
+        self.gloss = []
+        # 整句输入的分词结果（segmenter.Token 列表）
+        self.tokens = []
+        # 各阶段的耗时、候选数、SQL 次数和说明文字，调试面板和导出都用这份数据
+        self.trace = Trace(query)
+
+    @property
+    def debug_log(self):
+        return self.trace.markdown()
+
+    @property
+    def found_ids(self):
+        ids = set()
+        for tier in TIERS:
+            ids.update(getattr(self, tier))
+        for token in self.tokens:
+            ids.update(token.idseqs[:1])
+        return ids
+
+    def to_dict(self, engine=None, offset=0, limit=RESULT_LIMIT):
+        """
+        转成字典；每个层级只输出 [offset, offset + limit) 这一页，
+        并附带总数和下一页的 offset（没有更多结果时为 None）。
+        传入 engine 时会把这一页的 idseq 展开成词条内容。
+        """
+        def expand(idseqs):
+            if engine is None:
+                return list(idseqs)
+            return [entry_to_dict(entry) for entry in engine.hydrate(idseqs)]
+
+        def tier_page(idseqs):
+            end = offset + limit
+            return {
+                'total': len(idseqs),
+                'offset': offset,
+                'next_offset': end if end < len(idseqs) else None,
+                'entries': expand(idseqs[offset:end]),
+            }
+
+        return {
+            'query': self.query,
+            'processed_query': self.processed_query,
+            'tier1': tier_page(self.tier1),
+            'chinese': tier_page(self.chinese),
+            'deinflect': tier_page(self.deinflect),
+            'suggestions': expand(self.suggestions),
+            'tier2': tier_page(self.tier2),
+            'contains': tier_page(self.contains),
+            'gloss': tier_page(self.gloss),
+            'tier3': tier_page(self.tier3),
+            'includes': tier_page(self.includes),
+            'tokens': tokens_to_dicts(self.tokens, engine),
+            'debug_log': self.debug_log,
+            'trace': self.trace.to_dicts(),
+        }
+
+
+class SearchEngine:
+    """
+    不依赖 Streamlit 的搜索引擎：输入预处理、层级 1/2/3、建议词查找、中文词义匹配、活用形还原、包含汉字匹配以及英文释义检索都在这里。
+    每个层级的方法都接收一个 found_ids 集合，只返回其中没有的新 idseq 并把它们加进去，
+    因此既可以像 app.py 那样一层一层地调用，也可以直接用 search() 一次跑完。
+    """
+
+    def __init__(self, db, index, fuzzy, zh_table, features, completion, gloss, deinflector, cedict=None,
+                 cache=None, tracer=None, entries=None):
+        # 词典数据库的只读连接池，所有线程共用（加载词条时借用连接）
+        self.db = db
+        self.index = index
+        self.fuzzy = fuzzy
+        self.zh_table = zh_table
+        self.features = features
+        self.completion = completion
+        self.gloss = gloss
+        self.deinflector = deinflector
+        self.segmenter = Segmenter(index, deinflector, features)
+        # 没有 CC-CEDICT 数据时为 None，跳过中文词义匹配
+        self.cedict = cedict
+        # 结果缓存跟着引擎走：词典重建后会构建新的引擎，旧的缓存随之失效
+        self.cache = cache if cache is not None else ResultCache()
+        self.entries = entries if entries is not None else EntryCache()
+        self.tracer = tracer if tracer is not None else TraceRecorder()
+
+    @classmethod
+    def from_db(cls, db_file=JMD_DB_PATH, area='Simplified'):
+        """从词典数据库构建引擎所需的全部资源；之后的查询都通过只读连接池读取数据库，不再创建 Jamdict 实例。"""
+        features = RankFeatures.load(db_file)
+        return cls(
+            ReadPool(db_file),
+            HeadwordIndex.from_db(db_file),
+            SymSpellIndex.from_db(db_file),
+            load_translation_table(area),
+            features,
+            CompletionIndex.from_db(db_file, features, k=COMPLETION_LIMIT),
+            GlossIndex.load(db_file, features),
+            Deinflector.from_db(db_file),
+            CedictIndex.load(db_file),
+        )
+
+    # --- 预处理 ---
+    def is_english(self, query):
+        """
+        判断一串字母是英文还是罗马音：有空格、数字等罗马音里不会出现的字符，
+        或者转成假名后还剩下字母（例如 school）时是英文；
+        结尾有没打完的辅音、而释义里又有这个词时（例如 cat、book）也按英文处理。
+        """
+        query = query.strip()
+        if not _ENGLISH_RE.match(query):
+            return False
+        if not is_romaji(query):
+            return True
+        kana, pending = romaji_to_kana(query)
+        if re.search(r'[a-z]', kana):
+            return True
+        return bool(pending) and pending != 'n' and self.gloss.has_term(query)
+
+    def preprocess(self, query, log=None):
+        """英文原样保留（小写），罗马音转平假名，简/繁体汉字转日文汉字。"""
+        log = log if log is not None else []
+        log.append(f"**原始输入:** `{query}`")
+        if self.is_english(query):
+            processed_query = query.strip().lower()
+            log.append(f"**类型判断:** 英文 -> 释义全文检索 `{processed_query}`")
+        elif is_romaji(query):
+            # 结尾还没打完的辅音不参与搜索，层级 2 会按已转换的假名做前缀匹配
+            with span('preprocess.romaji'):
+                processed_query, pending = romaji_to_kana(query)
+            if pending == 'n':
+                processed_query += 'ん'
+            elif pending:
+                log.append(f"**未完成的罗马音:** `{pending}`（按前缀 `{processed_query}` 搜索）")
+            log.append(f"**类型判断:** 罗马音 -> `{processed_query}`")
+        else:
+            with span('preprocess.zh'):
+                processed_query = replace_zh_to_jp(query, self.zh_table)
+            if processed_query != query: log.append(f"**类型判断:** 中文 -> `{processed_query}`")
+            else: log.append(f"**类型判断:** 日文")
+        return processed_query
+
+    # --- 分层搜索 ---
+    @staticmethod
+    def _take_new(idseqs, found_ids):
+        new_ids = []
+        for idseq in idseqs:
+            if idseq not in found_ids:
+                new_ids.append(idseq)
+                found_ids.add(idseq)
+        return new_ids
+
+    def _rank(self, idseqs, processed_query, tier):
+        with span('rank', tier=tier) as s:
+            s.count = len(idseqs)
+            return self.features.rank(idseqs, processed_query)
+
+    def tier1(self, processed_query, found_ids, log=None):
+        """层级 1: 完全匹配"""
+        log = log if log is not None else []
+        log.append("\n---\n**层级 1: 完全匹配**\n---")
+        new_ids = self._take_new(self.index.exact(processed_query), found_ids)
+        log.append(f"找到 {len(new_ids)} 个新结果。")
+        return self._rank(new_ids, processed_query, 'tier1')
+
+    def fuzzy_matches(self, processed_query, max_distance=None, memo=None):
+        """
+        编辑距离模糊匹配的读音列表（只对假名查询）。5 个假名以上允许 2 处编辑时一次要 30 ms 左右，
+        所以只在确实需要时调用；memo 是同一个查询内共用的 {编辑距离: 结果}，同样的距离只查一次。
+        """
+        if not is_kana(processed_query):
+            return []
+        distance = self.fuzzy.default_distance(processed_query)
+        if max_distance is not None:
+            distance = min(distance, max_distance)
+        memo = memo if memo is not None else {}
+        if distance not in memo:
+            memo[distance] = self.fuzzy.lookup(processed_query, distance)
+        return memo[distance]
+
+    def suggestions(self, processed_query, exclude_ids, log=None, fuzzy_memo=None):
+        """建议词：先找折叠读音完全相同的词条，不够再用编辑距离模糊匹配补足"""
+        log = log if log is not None else []
+        log.append("\n---\n**建议词: 查找促音容错**\n---")
+        suggestion_ids = []
+        # 一次查找覆盖所有促音、长音、小写假名、平片假名的变体
+        self._add_suggestions(suggestion_ids, self.index.folded_exact(processed_query), exclude_ids)
+        # 还不够时，假名输入再加上编辑距离最近的读音（打错字的情况）；建议词最多只允许 1 处编辑
+        if len(suggestion_ids) < SUGGESTION_LIMIT:
+            fuzzy_matches = self.fuzzy_matches(processed_query, SUGGESTION_MAX_DISTANCE, fuzzy_memo)
+            if fuzzy_matches:
+                self._add_suggestions(suggestion_ids, self.fuzzy.expand(processed_query, fuzzy_matches), exclude_ids)
+        log.append(f"找到 {len(suggestion_ids)} 个建议词。")
+        return suggestion_ids
+
+    @staticmethod
+    def _add_suggestions(suggestion_ids, candidates, exclude_ids):
+        for idseq in candidates:
+            # 建议词不需要太多，限制一下数量
+            if len(suggestion_ids) >= SUGGESTION_LIMIT:
+                return
+            # 确保不与主结果重复，并且建议结果自身不重复
+            if idseq not in exclude_ids and idseq not in suggestion_ids:
+                suggestion_ids.append(idseq)
+
+    def tier2(self, processed_query, found_ids, log=None):
+        """层级 2: 前缀匹配"""
+        log = log if log is not None else []
+        log.append("\n---\n**层级 2: 前缀匹配**\n---")
+        new_ids = self._take_new(self.index.prefix(processed_query), found_ids)
+        log.append(f"找到 {len(new_ids)} 个新结果。")
+        return self._rank(new_ids, processed_query, 'tier2')
+
+    def contains_tier(self, processed_query, found_ids, log=None):
+        """包含匹配: 汉字形式中含有查询里所有汉字的词条（倒排表求交集）"""
+        log = log if log is not None else []
+        chars = kanji_chars(processed_query)
+        log.append("\n---\n**包含匹配: 含有汉字 " + "、".join(f"`{c}`" for c in chars) + "**\n---")
+        new_ids = self._take_new(self.index.contains(processed_query), found_ids)
+        log.append(f"找到 {len(new_ids)} 个新结果。")
+        return self._rank(new_ids, processed_query, 'contains')
+
+    def tier3(self, processed_query, found_ids, log=None, fuzzy_memo=None):
+        """层级 3: 容错匹配（折叠读音、砍尾、只取汉字、编辑距离）"""
+        log = log if log is not None else []
+        log.append("\n---\n**层级 3: 容错匹配**\n---")
+        log.append(f"折叠读音: `{fold_reading(processed_query)}`")
+        tolerant_queries = set()
+        if len(processed_query) > 2: tolerant_queries.add(processed_query[:-1])
+        kanji_only_str = only_kanji(processed_query)
+        if kanji_only_str and kanji_only_str != processed_query: tolerant_queries.add(kanji_only_str)
+        log.append(f"生成容错搜索词: `{list(tolerant_queries)}`")
+
+        # 促音/长音等所有读音变体只需一次折叠索引查找
+        new_ids = self._take_new(self.index.folded_prefix(processed_query), found_ids)
+        for t_query in tolerant_queries:
+            if not t_query: continue
+            new_ids += self._take_new(self.index.prefix(t_query), found_ids)
+        # 编辑距离模糊匹配：处理打错、漏打、多打假名的情况
+        if is_kana(processed_query):
+            fuzzy_matches = self.fuzzy_matches(processed_query, memo=fuzzy_memo)
+            log.append(f"模糊匹配读音: `{[word for word, _ in fuzzy_matches[:10]]}`")
+            new_ids += self._take_new(self.fuzzy.expand(processed_query, fuzzy_matches), found_ids)
+        log.append(f"找到 {len(new_ids)} 个新结果。")
+        return self._rank(new_ids, processed_query, 'tier3')
+
+    def chinese_tier(self, word, found_ids, log=None):
+        """中文词义: 按 CC-CEDICT 预先算好的链接查找中文词对应的日文词条"""
+        log = log if log is not None else []
+        log.append("\n---\n**中文词义: CC-CEDICT 链接**\n---")
+        for pinyin, meanings in self.cedict.meanings(word):
+            log.append(f"`{word}` [{pinyin}] {meanings}")
+        new_ids = self._take_new(self.cedict.lookup(word), found_ids)
+        log.append(f"找到 {len(new_ids)} 个新结果。")
+        return new_ids
+
+    def deinflect_tier(self, processed_query, found_ids, log=None):
+        """活用形还原: 按活用规则推出辞书形（食べた -> 食べる），只保留词性相符的词条"""
+        log = log if log is not None else []
+        log.append("\n---\n**活用形还原**\n---")
+        # 活用路径短的优先，同样长时专用规则优先（行った -> 行く），再按常用度等排序规则
+        matches = [m for m in self.deinflector.ranked(processed_query, self.features.sort_key) if m[0] not in found_ids]
+        for _, term, reasons in matches[:10]:
+            log.append(f"`{processed_query}` ← `{term}`（{' → '.join(reasons)}）")
+        new_ids = self._take_new([idseq for idseq, _, _ in matches], found_ids)
+        log.append(f"找到 {len(new_ids)} 个新结果。")
+        return new_ids
+
+    def gloss_tier(self, gloss_query, found_ids, log=None):
+        """英文释义: FTS5 全文检索，按 BM25、首义项和常用度排序"""
+        log = log if log is not None else []
+        log.append("\n---\n**英文释义: 全文检索**\n---")
+        new_ids = self._take_new(self.gloss.search(gloss_query), found_ids)
+        log.append(f"找到 {len(new_ids)} 个新结果。")
+        return new_ids
+
+    def includes_tier(self, processed_query, found_ids, log=None):
+        """层级 3: 子串匹配（二元组倒排表求交集后逐个确认）"""
+        log = log if log is not None else []
+        log.append("\n---\n**层级 3: 子串匹配**\n---")
+        new_ids = self._take_new(self.index.includes(processed_query), found_ids)
+        log.append(f"找到 {len(new_ids)} 个新结果。")
+        return self._rank(new_ids, processed_query, 'includes')
+
+    def iter_search(self, result):
+        """
+        在一次调用中依次执行预处理和全部层级，把结果写入 result（SearchResult），
+        每完成一个阶段就 yield 该阶段的名称，调用方可以边搜索边显示已完成的层级。
+        搜索期间 result.trace 处于激活状态，调用方在两次 yield 之间加载和绘制词条的耗时也会记录进去；
+        搜索结束后整个 trace 交给 self.tracer 汇总。
+        """
+        with activate(result.trace):
+            try:
+                yield from self._iter_stages(result)
+            finally:
+                self.tracer.record(result.trace)
+
+    def _iter_stages(self, result):
+        trace = result.trace
+        if not is_valid_query(result.query):
+            trace.event('invalid', "为提高效率，请输入一个以上的假名/字母，或一个汉字。")
+            return
+        found_ids = set()
+        with span('preprocess') as s:
+            result.processed_query = self.preprocess(result.query, s.logs)
+        yield 'preprocess'
+        if not result.processed_query:
+            trace.event('empty', "没有可以搜索的内容。")
+            return
+
+        # 粘贴进来的整句/整段：不做分层搜索，切分成词后逐词给出词条。
+        # 本身就是词典中的词或其活用形（ありがとうございます、食べさせられなかった）时仍按单词搜索
+        if not _ENGLISH_RE.match(result.processed_query) and self.is_sentence(result.processed_query):
+            with span('segment') as s:
+                result.tokens = self.segment(result.processed_query, s.logs)
+                s.count = len(result.tokens)
+            yield 'segment'
+            trace.event('done', "\n---\n**所有搜索已完成**\n---")
+            return
+
+        # 英文只做释义检索；同时也是英文单词的罗马音（例如 sushi）在假名层级之后再补上释义检索的结果
+        english = bool(_ENGLISH_RE.match(result.processed_query))
+        gloss_query = result.processed_query if english else None
+        if not english and is_romaji(result.query) and self.gloss.has_term(result.query):
+            gloss_query = result.query.lower()
+        # 整个输入都是汉字时当作中文词，先查 CC-CEDICT 链接表
+        chinese_word = result.query if self.cedict is not None and only_kanji(result.query) == result.query else None
+        cache_key = (result.processed_query, gloss_query, chinese_word)
+
+        with span('cache') as s:
+            cached = self.cache.get(cache_key)
+        if cached is not None:
+            s.logs.append("\n---\n**结果缓存命中，跳过所有层级**\n---")
+            for stage in ResultCache.FIELDS:
+                setattr(result, stage, cached[stage])
+                if cached[stage]:
+                    yield stage
+            trace.event('cache_stats', self.cache_summary())
+            return
+
+        if english:
+            with span('gloss') as s:
+                result.gloss = self.gloss_tier(gloss_query, found_ids, s.logs)
+                s.count = len(result.gloss)
+            yield 'gloss'
+            self.cache.put(cache_key, result)
+            trace.event('done', "\n---\n**所有搜索已完成**\n---")
+            trace.event('cache_stats', self.cache_summary())
+            return
+
+        with span('tier1') as s:
+            result.tier1 = self.tier1(result.processed_query, found_ids, s.logs)
+            s.count = len(result.tier1)
+        yield 'tier1'
+        if chinese_word:
+            with span('chinese') as s:
+                result.chinese = self.chinese_tier(chinese_word, found_ids, s.logs)
+                s.count = len(result.chinese)
+            yield 'chinese'
+        with span('deinflect') as s:
+            result.deinflect = self.deinflect_tier(result.processed_query, found_ids, s.logs)
+            s.count = len(result.deinflect)
+        yield 'deinflect'
+        with span('suggestions') as s:
+            # 同一查询内的模糊匹配结果，建议词和层级 3 使用相同的编辑距离时共用
+            fuzzy_memo = {}
+            result.suggestions = self.suggestions(result.processed_query, found_ids, s.logs, fuzzy_memo)
+            s.count = len(result.suggestions)
+        yield 'suggestions'
+        with span('tier2') as s:
+            result.tier2 = self.tier2(result.processed_query, found_ids, s.logs)
+            s.count = len(result.tier2)
+        yield 'tier2'
+        # 只有汉字的查询（例如 沢）再列出所有含有这些汉字的词条
+        if only_kanji(result.processed_query) == result.processed_query:
+            with span('contains') as s:
+                result.contains = self.contains_tier(result.processed_query, found_ids, s.logs)
+                s.count = len(result.contains)
+            yield 'contains'
+        if gloss_query:
+            with span('gloss') as s:
+                result.gloss = self.gloss_tier(gloss_query, found_ids, s.logs)
+                s.count = len(result.gloss)
+            yield 'gloss'
+        # 前面都没有结果时才进行容错匹配，以及任意位置的子串匹配
+        if not found_ids:
+            with span('tier3') as s:
+                result.tier3 = self.tier3(result.processed_query, found_ids, s.logs, fuzzy_memo)
+                s.count = len(result.tier3)
+            yield 'tier3'
+            if len(result.processed_query) >= 2:
+                with span('includes') as s:
+                    result.includes = self.includes_tier(result.processed_query, found_ids, s.logs)
+                    s.count = len(result.includes)
+                yield 'includes'
+        self.cache.put(cache_key, result)
+        trace.event('done', "\n---\n**所有搜索已完成**\n---")
+        trace.event('cache_stats', self.cache_summary())
+
+    def is_sentence(self, text):
+        """看起来像整句（见 segmenter.is_sentence），并且既不是词典形式，也不能还原成某个词的活用形。"""
+        return is_sentence(text) and not self.index.exact(text) and not self.deinflector.lookup(text)
+
+    def segment(self, text, log=None):
+        """分词模式: 在所有词典形式上做最长匹配（含活用形还原），返回 segmenter.Token 列表"""
+        log = log if log is not None else []
+        log.append("\n---\n**分词模式: 最长匹配**\n---")
+        tokens = self.segmenter.segment(text)
+        log.append(" / ".join(f"`{t.surface}`" if t.idseqs else t.surface for t in tokens))
+        log.append(f"切分出 {len(tokens)} 个片段，其中 {sum(1 for t in tokens if t.idseqs)} 个在词典中。")
+        return tokens
+
+    def cache_summary(self):
+        stats = self.cache.stats()
+        return (f"**结果缓存:** 命中 {stats['hits']} / 未命中 {stats['misses']} / 淘汰 {stats['evictions']}"
+                f"（命中率 {stats['hit_rate']:.0%}，已缓存 {stats['entries']} 个查询）；"
+                f"词条缓存 {len(self.entries)} 条（命中率 {self.entries.stats()['hit_rate']:.0%}）")
+
+    def search(self, query):
+        """一次跑完预处理和全部层级，返回 SearchResult。"""
+        result = SearchResult(query)
+        for _ in self.iter_search(result):
+            pass
+        return result
+
+    def complete(self, query, limit=COMPLETION_LIMIT):
+        """
+        输入补全：和搜索一样先做预处理（罗马音/中文转换，没打完的罗马音只取已转换的部分），
+        再从补全索引中取以它开头的排名最高的词条。返回 (预处理后的查询, 补全列表)。
+        """
+        processed_query = self.preprocess(query, [])
+        completions = self.completion.complete(processed_query, limit)
+        return processed_query, [{'text': text, 'idseq': idseq} for text, idseq in completions]
+
+    def hydrate(self, idseqs):
+        """按 idseq 取显示用的 EntryView（见 entry_view.py）：先查共享的词条缓存，只从数据库加载没缓存的。"""
+        views = self.entries.get_many(idseqs)
+        missing = [idseq for idseq in dict.fromkeys(idseqs) if idseq not in views]
+        if missing:
+            loaded = self.index.hydrate(self.db, missing)
+            self.entries.put_many(loaded)
+            views.update((view.idseq, view) for view in loaded)
+        return [views[idseq] for idseq in idseqs if idseq in views]
+
+    def page(self, idseqs, offset=0, limit=RESULT_LIMIT):
+        """只加载排好序的 idseq 列表中的一页词条。"""
+        return self.hydrate(idseqs[offset:offset + limit])
+
+
+# --- 本地 HTTP/JSON 接口 ---
+def make_handler(engine):
+    class SearchHandler(BaseHTTPRequestHandler):
+        """
+        GET /search?q=学校&offset=0&limit=30 返回 JSON 格式的分层搜索结果；
+        GET /complete?q=がっ&limit=10 返回输入补全候选；
+        GET /segment?q=私は学校に行きました 返回整段文字的分词结果和每个词的词条；
+        GET /metrics 返回 Prometheus 文本格式的各阶段耗时统计。
+        """
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/metrics':
+                self._send_text(200, engine.tracer.prometheus_text())
+                return
+            if url.path not in ('/search', '/complete', '/segment'):
+                self._send_json(404, {'error': 'not found'})
+                return
+            params = parse_qs(url.query)
+            query = params.get('q', [''])[0].strip()
+            if not query:
+                self._send_json(400, {'error': "缺少参数 'q'"})
+                return
+            if url.path == '/complete':
+                self._complete(query, params)
+                return
+            if url.path == '/segment':
+                try:
+                    self._send_json(200, {'text': query, 'tokens': tokens_to_dicts(engine.segment(query), engine)})
+                except Exception as e:
+                    self._send_json(500, {'error': str(e)})
+                return
+            try:
+                offset = max(0, int(params.get('offset', ['0'])[0]))
+                limit = max(1, min(int(params.get('limit', [str(RESULT_LIMIT)])[0]), 200))
+            except ValueError:
+                self._send_json(400, {'error': "offset/limit 必须是整数"})
+                return
+            try:
+                self._send_json(200, engine.search(query).to_dict(engine, offset, limit))
+            except Exception as e:
+                self._send_json(500, {'error': str(e)})
+
+        def _complete(self, query, params):
+            try:
+                limit = max(1, min(int(params.get('limit', [str(COMPLETION_LIMIT)])[0]), COMPLETION_LIMIT))
+            except ValueError:
+                self._send_json(400, {'error': "limit 必须是整数"})
+                return
+            try:
+                processed_query, completions = engine.complete(query, limit)
+                self._send_json(200, {'query': query, 'processed_query': processed_query, 'completions': completions})
+            except Exception as e:
+                self._send_json(500, {'error': str(e)})
+
+        def _send_text(self, status, text):
+            body = text.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return SearchHandler
+
+
+def serve(engine, host='127.0.0.1', port=8765):
+    """启动一个常驻进程的本地 JSON 接口，多个客户端共用同一个已加载好的引擎。"""
+    server = ThreadingHTTPServer((host, port), make_handler(engine))
+    print(f"搜索接口已启动: http://{host}:{port}/search?q=...")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="不依赖 Streamlit 的词典搜索引擎")
+    parser.add_argument('--db', default=JMD_DB_PATH, help="Jamdict 词典数据库路径")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--query', help="只搜索一次并打印 JSON 结果，不启动 HTTP 接口")
+    parser.add_argument('--complete', help="只打印这个前缀的输入补全，不启动 HTTP 接口")
+    parser.add_argument('--segment', help="只打印这段文字的分词结果，不启动 HTTP 接口")
+    parser.add_argument('--trace-file', help="把每次搜索各阶段的记录追加写入这个 JSON lines 文件")
+    args = parser.parse_args()
+
+    engine = SearchEngine.from_db(args.db)
+    engine.tracer = TraceRecorder(args.trace_file)
+    if args.query:
+        print(json.dumps(engine.search(args.query).to_dict(engine), ensure_ascii=False, indent=2))
+    elif args.segment:
+        print(json.dumps(tokens_to_dicts(engine.segment(args.segment), engine), ensure_ascii=False, indent=2))
+    elif args.complete:
+        print(json.dumps(engine.complete(args.complete)[1], ensure_ascii=False, indent=2))
+    else:
+        serve(engine, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import bisect
+import re
+from collections import namedtuple
+
+from kana_utils import is_kana
+
+# 比任何假名/汉字都大的字符，用于确定以某个前缀开头的键的范围
+_PREFIX_END = '\U0010ffff'
+# 最长匹配时最多向后看的字符数（JMdict 中更长的形式几乎都是惯用句）
+MAX_WORD_LEN = 16
+# 活用形还原时，词干后面最多再带几个平假名的活用词尾（食べさせられなかった）
+MAX_INFLECTION_LEN = 10
+
+_HIRAGANA_RE = re.compile(r'[ぁ-ゖ]')
+
+# 分词结果：原文中的片段、起始位置、辞书形（没有活用时与 surface 相同）、活用路径、排好序的 idseq
+Token = namedtuple('Token', 'surface start base reasons idseqs')
+
+
+class Segmenter:
+    """
+    把整句/整段日文切分成词：在 HeadwordIndex 排好序的全部汉字/假名形式上做贪心最长匹配。
+    有序数组本身就是一棵隐式的字典树：每多读一个字符，以当前前缀开头的键仍是一段连续的区间，
+    用两次二分把区间缩小，区间为空时就不可能再匹配更长的词，因此每个位置只需向后走到失配为止。
+    词典形式后面紧跟平假名时再交给活用形还原，匹配到更长的活用形（食べました -> 食べる）时优先。
+    """
+
+    def __init__(self, index, deinflector, features):
+        self.keys = index.forms.keys
+        self.index = index
+        self.deinflector = deinflector
+        self.features = features
+
+    def _longest(self, text, i):
+        """text[i:] 开头能匹配的最长词典形式的长度，没有则为 0。"""
+        keys = self.keys
+        lo, hi = 0, len(keys)
+        best = 0
+        for j in range(i + 1, min(len(text), i + MAX_WORD_LEN) + 1):
+            prefix = text[i:j]
+            lo = bisect.bisect_left(keys, prefix, lo, hi)
+            hi = bisect.bisect_left(keys, prefix + _PREFIX_END, lo, hi)
+            if lo >= hi:
+                break
+            if keys[lo] == prefix:
+                best = j - i
+        return best
+
+    def _inflected(self, text, i, length):
+        """
+        从 text[i + length] 开始的平假名可能是活用词尾：由长到短尝试还原，
+        返回 (长度, 辞书形, 活用路径, idseq 列表)，都不成立时返回 None。
+        """
+        end = i + max(length, 1)
+        limit = min(len(text), end + MAX_INFLECTION_LEN)
+        while end < limit and _HIRAGANA_RE.match(text[end]):
+            end += 1
+        for j in range(end, i + length, -1):
+            matches = self.deinflector.ranked(text[i:j], self.features.sort_key)
+            if matches:
+                _, base, reasons = matches[0]
+                return j - i, base, reasons, [idseq for idseq, _, _ in matches]
+        return None
+
+    def segment(self, text):
+        """返回 Token 列表；词典中找不到的连续字符（标点、未登录词）合成一个没有 idseq 的 Token。"""
+        tokens = []
+        unknown_start = None
+        i = 0
+        n = len(text)
+        while i < n:
+            length = self._longest(text, i)
+            inflected = None
+            if i + max(length, 1) < n and _HIRAGANA_RE.match(text[i + max(length, 1)]):
+                inflected = self._inflected(text, i, length)
+            if inflected is None and length == 0:
+                if unknown_start is None:
+                    unknown_start = i
+                i += 1
+                continue
+            if unknown_start is not None:
+                tokens.append(Token(text[unknown_start:i], unknown_start, text[unknown_start:i], (), []))
+                unknown_start = None
+            if inflected is not None and inflected[0] > length:
+                length, base, reasons, idseqs = inflected
+                tokens.append(Token(text[i:i + length], i, base, reasons, idseqs))
+            else:
+                surface = text[i:i + length]
+                idseqs = self.features.rank(self.index.exact(surface), surface)
+                tokens.append(Token(surface, i, surface, (), idseqs))
+            i += length
+        if unknown_start is not None:
+            tokens.append(Token(text[unknown_start:], unknown_start, text[unknown_start:], (), []))
+        return tokens
+
+
+def is_sentence(text, min_length=10):
+    """
+    粘贴进来的整句/整段：含有句读、括号或空白，或者较长且夹杂假名。
+    这类输入按分词模式处理，而不是当作一个词去做完全/前缀匹配。
+    """
+    if re.search(r'[。、！？!?「」『』（）\s]', text.strip()):
+        return True
+    return len(text) >= min_length and any(is_kana(c) for c in text)
@@ -1,11 +1,32 @@
+import os
 import sqlite3
 import opencc
 import re
 
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPT_DIR)
+DB_PATH = os.path.join(SCRIPT_DIR, "KANJI_MAP_STJ.db")
+
 # 初始化 OpenCC 转换器
 s2t_converter = opencc.OpenCC('s2t')  # 简体转繁体
 t2s_converter = opencc.OpenCC('t2s')  # 繁体转简体
 
+# 各 area 对应的 OpenCC 转换链，与 kanji_trans.py / app_STJ.py 中的 convert_to_japanese_char 保持一致
+AREA_CONVERTERS = {
+    'Simplified': ('s2t.json', 't2jp.json'),
+    'Traditional': ('hk2t.json',),
+    'Taiwan Traditional': ('tw2t.json', 't2jp.json'),
+    'Hong Kong variant': ('hk2t.json', 't2jp.json'),
+}
+
+# 需要预先转换的 CJK 码位范围：扩展A、基本区、兼容汉字、扩展B~F及兼容补充
+CJK_RANGES = [
+    (0x3400, 0x4DBF),
+    (0x4E00, 0x9FFF),
+    (0xF900, 0xFAFF),
+    (0x20000, 0x2FA1F),
+]
+
 # 函数：从日文汉字生成三元组
 def generate_zh_to_jp_data(jp_chars):
     """
@@ -34,6 +55,25 @@ def generate_zh_to_jp_data(jp_chars):
     
     return zh_to_jp_data
 
+# 函数：为某个 area 生成整张逐字转换表
+def generate_translation_table(area):
+    """
+    对 CJK_RANGES 中的每个字符执行一次 area 对应的 OpenCC 转换链，
+    只保留转换结果与原字符不同的项。
+    输出：(area, 原字符, 日文汉字) 三元组列表，运行时直接组装成 str.translate 用的表。
+    """
+    converters = [opencc.OpenCC(name) for name in AREA_CONVERTERS[area]]
+    rows = []
+    for start, end in CJK_RANGES:
+        for code in range(start, end + 1):
+            char = chr(code)
+            out_char = char
+            for converter in converters:
+                out_char = converter.convert(out_char)
+            if out_char and out_char != char:
+                rows.append((area, char, out_char))
+    return rows
+
 # 读取 TXT 文件
 def read_jp_chars_from_file(file_path):
     """从 TXT 文件读取日文汉字"""
@@ -44,7 +84,7 @@ def read_jp_chars_from_file(file_path):
 # 主程序
 def main():
     # 文件路径（假设文件名为 jp_chars.txt）
-    file_path = "./kanji/jyouyou_list.txt"
+    file_path = os.path.join(REPO_DIR, "kanji", "jyouyou_list.txt")
     
     # 读取日文汉字
     jp_chars = read_jp_chars_from_file(file_path)
@@ -53,7 +93,7 @@ def main():
     zh_to_jp_data = generate_zh_to_jp_data(jp_chars)
     
     # 连接数据库
-    conn = sqlite3.connect("KANJI_MAP_STJ.db")
+    conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
     # 创建 zh_to_jp 表
@@ -65,6 +105,16 @@ def main():
     cursor.executemany("INSERT INTO zh_to_jp VALUES (?, ?, ?)", zh_to_jp_data)
     conn.commit()
 
+    # 创建 zh_to_jp_table 表：全 CJK 范围、四种 area 的逐字转换表
+    cursor.execute("DROP TABLE IF EXISTS zh_to_jp_table")
+    cursor.execute('''CREATE TABLE zh_to_jp_table
+                      (area TEXT, src TEXT, dst TEXT, PRIMARY KEY (area, src))''')
+    for area in AREA_CONVERTERS:
+        rows = generate_translation_table(area)
+        cursor.executemany("INSERT INTO zh_to_jp_table VALUES (?, ?, ?)", rows)
+        print(f"{area}: {len(rows)} 个字符需要转换")
+    conn.commit()
+
     # 可选：打印前几条数据检查
     cursor.execute("SELECT * FROM zh_to_jp LIMIT 5")
     print("前 5 条数据：")
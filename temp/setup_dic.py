@@ -1,6 +1,9 @@
 import os
+import sys
 from pathlib import Path
-from jamdict import Jamdict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from build_jmdict import build_jmdict
 
 # --- 1. 定义和检查路径 (强制在当前目录) ---
 # 获取当前脚本所在的文件夹
@@ -24,14 +27,11 @@ elif DB_FILE.exists():
 else:
     # --- 3. 核心创建逻辑 ---
     print("前置检查通过，准备开始创建数据库...")
-    print("这个过程需要几分钟，请保持耐心。")
     try:
-        # 这是最关键的一步：在初始化时，将文件路径作为参数直接传递给 Jamdict
-        # 这将强制它在当前目录工作，而不是去 C盘的默认路径
-        jam = Jamdict(db_file=str(DB_FILE), jmd_xml_file=str(XML_FILE))
-        
-        print("Jamdict 初始化调用完成。")
-        
+        # 流式解析 + 批量写入，原来 Jamdict 导入需要几分钟，现在通常在半分钟内完成
+        count, timings = build_jmdict(str(XML_FILE), str(DB_FILE))
+        print(f"共导入 {count} 个词条，用时 {timings['total']:.1f} 秒。")
+
         # --- 4. 最终验证 ---
         # 初始化完成后，立刻检查数据库文件是否真的被创建了
         if DB_FILE.exists():
@@ -42,11 +42,9 @@ else:
             print(f"大小: {db_size_mb:.2f} MB")
             print("="*30)
         else:
-            # 如果代码执行到这里，说明 Jamdict 运行没报错，但就是没创建文件
+            # 如果代码执行到这里，说明生成过程没报错，但就是没创建文件
             print("\n" + "!"*30)
-            print("严重错误：Jamdict 初始化过程没有报错，但数据库文件并未被创建。")
-            print("这表明您使用的 Jamdict 版本存在核心功能缺陷。")
-            print("建议更换 Jamdict 库的版本。")
+            print("严重错误：生成过程没有报错，但数据库文件并未被创建。")
             print("!"*30)
 
     except Exception as e:
@@ -0,0 +1,191 @@
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# 当前线程正在记录的 Trace 和 SQL 计数。
+# 搜索代码的任何位置都可以用 span() 记录一个阶段，没有激活的 Trace 时什么也不做。
+_local = threading.local()
+
+# Prometheus 直方图的桶（秒）
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Span:
+    """一个阶段的记录：耗时、候选数、SQL 查询次数，以及给调试面板看的说明文字。"""
+
+    __slots__ = ('name', 'attrs', 'start', 'duration', 'count', 'sql_count', 'logs')
+
+    def __init__(self, name, attrs=None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.start = 0.0
+        self.duration = None
+        self.count = None
+        self.sql_count = 0
+        self.logs = []
+
+    def to_dict(self, trace_start):
+        return {
+            'name': self.name,
+            'start_ms': round((self.start - trace_start) * 1000, 3),
+            'duration_ms': None if self.duration is None else round(self.duration * 1000, 3),
+            'count': self.count,
+            'sql_count': self.sql_count,
+            'attrs': self.attrs,
+        }
+
+
+class Trace:
+    """一次搜索的所有阶段，按开始的先后顺序保存。"""
+
+    def __init__(self, query):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.query = query
+        self.timestamp = time.time()
+        self.start = time.perf_counter()
+        self.spans = []
+
+    @contextmanager
+    def span(self, name, **attrs):
+        span = Span(name, attrs)
+        self.spans.append(span)
+        sql_before = _sql_count()
+        span.start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.duration = time.perf_counter() - span.start
+            span.sql_count = _sql_count() - sql_before
+
+    def event(self, name, message=None, **attrs):
+        """没有耗时的记录（例如缓存命中、输入无效），只用来在调试面板中显示说明。"""
+        span = Span(name, attrs)
+        span.start = time.perf_counter()
+        if message:
+            span.logs.append(message)
+        self.spans.append(span)
+        return span
+
+    def markdown(self):
+        """把所有阶段渲染成调试面板中的 markdown 行：先是阶段的说明，再是耗时/候选数/SQL 次数。"""
+        lines = []
+        for span in self.spans:
+            lines += span.logs
+            if span.duration is not None:
+                parts = [f"`{span.name}` {span.duration * 1000:.2f} ms"]
+                if span.count is not None:
+                    parts.append(f"{span.count} 个候选")
+                if span.sql_count:
+                    parts.append(f"{span.sql_count} 次 SQL")
+                lines.append("⏱ " + " · ".join(parts))
+        return lines
+
+    def to_dicts(self):
+        return [
+            dict(trace_id=self.trace_id, query=self.query, timestamp=self.timestamp, **span.to_dict(self.start))
+            for span in self.spans if span.duration is not None
+        ]
+
+    def to_jsonl(self):
+        """每个阶段一行 JSON。"""
+        return "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in self.to_dicts())
+
+
+@contextmanager
+def activate(trace):
+    """在当前线程上激活 trace：期间所有 span() 都记录到它上面。"""
+    previous = getattr(_local, 'trace', None)
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+
+def current_trace():
+    return getattr(_local, 'trace', None)
+
+
+@contextmanager
+def span(name, **attrs):
+    """在当前激活的 Trace 上记录一个阶段；没有激活的 Trace 时返回一个不会被保存的 Span。"""
+    trace = current_trace()
+    if trace is None:
+        yield Span(name, attrs)
+        return
+    with trace.span(name, **attrs) as s:
+        yield s
+
+
+# --- SQL 计数 ---
+def _sql_count():
+    return getattr(_local, 'sql_count', 0)
+
+
+def _count_statement(_statement):
+    _local.sql_count = _sql_count() + 1
+
+
+def watch_sql(conn):
+    """让 sqlite3 连接上执行的每条语句都计入当前线程的 SQL 次数。"""
+    conn.set_trace_callback(_count_statement)
+    return conn
+
+
+class TraceRecorder:
+    """
+    进程内的 Trace 汇总：按阶段累计耗时直方图、候选数和 SQL 次数，导出为 Prometheus 文本格式；
+    指定 jsonl_path 时每个 Trace 的阶段还会追加写入 JSON lines 文件。
+    """
+
+    def __init__(self, jsonl_path=None, buckets=DURATION_BUCKETS):
+        self.jsonl_path = jsonl_path
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.traces = 0
+        # 阶段名 -> [各桶计数..., 总耗时, 次数, 候选数, SQL 次数]
+        self._stages = {}
+
+    def record(self, trace):
+        with self._lock:
+            self.traces += 1
+            for s in trace.spans:
+                if s.duration is None:
+                    continue
+                stats = self._stages.setdefault(s.name, {
+                    'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0, 'candidates': 0, 'sql': 0,
+                })
+                for i, bound in enumerate(self.buckets):
+                    if s.duration <= bound:
+                        stats['buckets'][i] += 1
+                stats['sum'] += s.duration
+                stats['count'] += 1
+                stats['candidates'] += s.count or 0
+                stats['sql'] += s.sql_count
+            if self.jsonl_path:
+                with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                    f.write(trace.to_jsonl())
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP search_traces_total 已记录的搜索次数",
+            "# TYPE search_traces_total counter",
+            f"search_traces_total {self.traces}",
+            "# HELP search_stage_duration_seconds 搜索各阶段的耗时",
+            "# TYPE search_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            stages = {name: dict(stats, buckets=list(stats['buckets'])) for name, stats in self._stages.items()}
+        for name, stats in stages.items():
+            for bound, n in zip(self.buckets, stats['buckets']):
+                lines.append(f'search_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {n}')
+            lines.append(f'search_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {stats["count"]}')
+            lines.append(f'search_stage_duration_seconds_sum{{stage="{name}"}} {stats["sum"]:.6f}')
+            lines.append(f'search_stage_duration_seconds_count{{stage="{name}"}} {stats["count"]}')
+        lines += ["# HELP search_stage_candidates_total 各阶段产生的候选数", "# TYPE search_stage_candidates_total counter"]
+        lines += [f'search_stage_candidates_total{{stage="{name}"}} {stats["candidates"]}' for name, stats in stages.items()]
+        lines += ["# HELP search_stage_sql_queries_total 各阶段执行的 SQL 语句数", "# TYPE search_stage_sql_queries_total counter"]
+        lines += [f'search_stage_sql_queries_total{{stage="{name}"}} {stats["sql"]}' for name, stats in stages.items()]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,27 @@
+import os
+import sqlite3
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+TRANS_DB_PATH = os.path.join(APP_DIR, 'temp', 'KANJI_MAP_STJ.db')
+
+AREAS = ('Simplified', 'Traditional', 'Taiwan Traditional', 'Hong Kong variant')
+
+
+def load_translation_table(area='Simplified', db_path=TRANS_DB_PATH):
+    """
+    读取 temp/make_transdb.py 预先生成的 zh_to_jp_table，返回可直接用于 str.translate 的转换表。
+    请求时不再需要 OpenCC；如果数据库里还没有这张表，请先运行 temp/make_transdb.py。
+    """
+    if area not in AREAS:
+        raise ValueError(f"未知的 area: {area}")
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute("SELECT src, dst FROM zh_to_jp_table WHERE area = ?", (area,))
+        return {ord(src): dst for src, dst in cursor}
+    finally:
+        conn.close()
+
+
+def replace_zh_to_jp(query, table):
+    """用预编译的转换表一次性把查询中的简/繁体汉字替换为日文汉字。"""
+    return query.translate(table)